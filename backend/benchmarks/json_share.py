@@ -0,0 +1,119 @@
+"""Share of request latency spent decoding and encoding JSON, Flask's stdlib provider vs ``FastJSONProvider``.
+
+Run from ``backend/``::
+
+    python -m benchmarks.json_share --size 200x200 --robots 10 --repeat 10
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+from app import app
+from kka_backend.utils.json_codec import ENGINE, FastJSONProvider
+
+
+class StdlibProvider(DefaultJSONProvider):
+    """Flask's default provider; arrays go through ``tolist`` first."""
+
+    @staticmethod
+    def default(obj: Any) -> Any:
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        return DefaultJSONProvider.default(obj)
+
+
+def timed(provider_cls):
+    class Timed(provider_cls):
+        def __init__(self, flask_app) -> None:
+            super().__init__(flask_app)
+            self.spent = 0.0
+
+        def loads(self, s: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return super().loads(s, **kwargs)
+            finally:
+                self.spent += time.perf_counter() - started
+
+        def response(self, *args: Any, **kwargs: Any):
+            started = time.perf_counter()
+            try:
+                return super().response(*args, **kwargs)
+            finally:
+                self.spent += time.perf_counter() - started
+
+    return Timed
+
+
+def scenario(width: int, height: int, robots: int, seed: int) -> Dict[str, bytes]:
+    """Request bodies for the main endpoints on one generated map, encoded up front."""
+    app.json = StdlibProvider(app)
+    client = app.test_client()
+    generated = client.post(
+        "/api/generate_map", json={"seed": seed, "width": width, "height": height, "num_robots": robots}
+    ).get_json()
+    plan = client.post("/api/plan_tasks", json=generated).get_json()
+    bodies = {
+        "generate_map": {"seed": seed, "width": width, "height": height, "num_robots": robots},
+        "plan_tasks": generated,
+        "compute_paths": dict(generated, robot_plans=plan["assigned"]),
+        "manual/apply": dict(generated, edits={}, confirm=True),
+    }
+    return {path: json.dumps(body).encode("utf-8") for path, body in bodies.items()}
+
+
+def measure(provider_cls, bodies: Dict[str, bytes], repeat: int) -> Dict[str, Any]:
+    provider = timed(provider_cls)(app)
+    app.json = provider
+    client = app.test_client()
+    report = {}
+    for path, body in bodies.items():
+        totals: List[float] = []
+        shares: List[float] = []
+        for _ in range(repeat + 1):
+            provider.spent = 0.0
+            started = time.perf_counter()
+            response = client.post(f"/api/{path}", data=body, content_type="application/json")
+            response.get_data()
+            total = time.perf_counter() - started
+            totals.append(total * 1000.0)
+            shares.append(provider.spent / total)
+        # The first round warms the path cache and is left out.
+        report[path] = {
+            "request_ms_p50": statistics.median(totals[1:]),
+            "json_ms_p50": statistics.median(t * s for t, s in zip(totals[1:], shares[1:])),
+            "json_share_p50": statistics.median(shares[1:]),
+            "request_bytes": len(body),
+            "response_bytes": len(response.get_data()),
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="200x200", help="map size as WIDTHxHEIGHT")
+    parser.add_argument("--robots", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    width, height = (int(part) for part in args.size.lower().split("x"))
+    bodies = scenario(width, height, args.robots, args.seed)
+    report = {
+        "size": [width, height],
+        "robots": args.robots,
+        "repeat": args.repeat,
+        "engine": ENGINE,
+        "before": measure(StdlibProvider, bodies, args.repeat),
+        "after": measure(FastJSONProvider, bodies, args.repeat),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
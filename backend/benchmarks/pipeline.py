@@ -0,0 +1,227 @@
+"""Per-stage timings of the planning pipeline on deterministic generated warehouses.
+
+Run from ``backend/``::
+
+    python -m benchmarks.pipeline --output bench.json
+    python -m benchmarks.pipeline --quick --baseline bench.json
+
+Every case derives its map, robots, tasks and forklifts from one seed, so two runs of the same case
+on different commits see identical inputs. Timings come from ``--repeat`` untraced rounds; peak
+memory from one extra round under ``tracemalloc``.
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from kka_backend.config import DEFAULT_WALL_RANGE, MAX_ROBOTS
+from kka_backend.services.assignments import (
+    analyze_reachability,
+    compile_task_assignments,
+    ga_assign,
+    greedy_assign,
+    hungarian_assign,
+    local_search_assign,
+    pq_greedy_assign,
+)
+from kka_backend.services.islands import island_ga_assign
+from kka_backend.services.map_generation import generate_moving_obstacles, generate_warehouse
+from kka_backend.services.paths import PathLibrary, build_step_columns
+from kka_backend.services.scheduling import ObstacleIndex, csp_schedule
+from kka_backend.utils.grid import get_free_cells
+from kka_backend.utils.json_codec import ENGINE
+from kka_backend.utils.selection import select_unique_cells
+
+Cell = Tuple[int, int]
+
+# (width, height, robots, tasks, forklifts)
+CASES = [
+    (30, 20, 2, 10, 3),
+    (30, 20, MAX_ROBOTS, 20, 5),
+    (60, 40, MAX_ROBOTS, 40, 8),
+    (100, 100, MAX_ROBOTS, 60, 10),
+    (200, 200, MAX_ROBOTS, 100, 20),
+]
+QUICK_CASES = CASES[:3]
+
+OPTIMIZERS: Dict[str, Callable[..., Dict[Cell, List[Cell]]]] = {
+    "greedy": greedy_assign,
+    "greedy_pq": pq_greedy_assign,
+    "hungarian": hungarian_assign,
+    "ga": ga_assign,
+    "ga_islands": island_ga_assign,
+    "local": local_search_assign,
+}
+SEEDED = {"ga", "ga_islands", "local"}
+DEFAULT_OPTIMIZERS = ["greedy", "greedy_pq", "hungarian", "ga", "local"]
+
+
+def build_case(width: int, height: int, robots: int, tasks: int, forklifts: int, seed: int) -> Dict[str, Any]:
+    grid, density = generate_warehouse(seed, width, height, DEFAULT_WALL_RANGE)
+    rng = random.Random(seed)
+    free = get_free_cells(grid)
+    robot_cells = select_unique_cells(rng, list(free), robots, forbidden=set())
+    remaining = [cell for cell in free if cell not in robot_cells]
+    task_cells = select_unique_cells(rng, remaining, tasks, forbidden=set(robot_cells))
+    moving = generate_moving_obstacles(grid, forklifts, rng, robot_cells, task_cells)
+    return {"grid": grid, "density": density, "robots": robot_cells, "tasks": task_cells, "moving": moving}
+
+
+def base_paths(planner: PathLibrary, assigned: Dict[Cell, List[Cell]]) -> Dict[Cell, List[Cell]]:
+    paths = {}
+    for robot, seq in assigned.items():
+        full = [robot]
+        for goal in seq:
+            path = planner.ensure(full[-1], goal)["path"]
+            if path:
+                full.extend(path[1:])
+        paths[robot] = full
+    return paths
+
+
+def run_round(
+    case: Dict[str, Any],
+    optimizers: List[str],
+    seed: int,
+    clock: Callable[[str, Callable[[], Any]], Any],
+) -> None:
+    """One pass over every stage; ``clock(name, fn)`` runs ``fn`` and records it under ``name``.
+
+    Each round starts from a cold ``PathLibrary``, so ``analyze_reachability`` pays for the distance
+    fields. The robot/task fields are then completed outside the clock, so every optimizer starts
+    from the same warm library, and downstream stages use the first optimizer's assignment.
+    """
+    grid = case["grid"]
+    clock("generate_warehouse", lambda: generate_warehouse(seed, grid.width, grid.height, DEFAULT_WALL_RANGE))
+    planner = PathLibrary(grid, "astar")
+    active, _, assignable, _ = clock(
+        "analyze_reachability", lambda: analyze_reachability(case["robots"], case["tasks"], planner)
+    )
+    planner.prepare(list(case["robots"]) + list(case["tasks"]))
+    first: Optional[Dict[Cell, List[Cell]]] = None
+    for name in optimizers:
+        optimizer = OPTIMIZERS[name]
+        kwargs = {"seed": seed} if name in SEEDED else {}
+        result = clock(f"optimizer.{name}", lambda: optimizer(grid, active, assignable, "astar", planner, **kwargs))
+        first = result if first is None else first
+    assigned = {robot: (first or {}).get(robot, []) for robot in case["robots"]}
+    clock("compile_task_assignments", lambda: compile_task_assignments(case["robots"], assigned, planner))
+    paths = base_paths(planner, assigned)
+    obstacles = ObstacleIndex(case["moving"], grid)
+    csp = clock("csp_schedule", lambda: csp_schedule(paths, obstacles, max_offset=40))
+    offsets = csp.get("start_times") or {}
+    timed = {robot: [path[0]] * int(offsets.get(robot, 0)) + path for robot, path in paths.items()}
+    clock("build_step_columns", lambda: [build_step_columns(path, assigned[robot]) for robot, path in timed.items()])
+
+
+def summarize(samples: List[float], peak: int) -> Dict[str, float]:
+    ordered = sorted(samples)
+    mean = statistics.fmean(ordered)
+    return {
+        "ops_per_sec": 1.0 / mean if mean > 0 else float("inf"),
+        "mean_ms": mean * 1000.0,
+        "p50_ms": float(np.percentile(ordered, 50)) * 1000.0,
+        "p95_ms": float(np.percentile(ordered, 95)) * 1000.0,
+        "peak_kib": peak / 1024.0,
+        "samples": len(ordered),
+    }
+
+
+def bench_case(spec: Tuple[int, int, int, int, int], seed: int, optimizers: List[str], repeat: int) -> Dict[str, Any]:
+    width, height, robots, tasks, forklifts = spec
+    case = build_case(width, height, robots, tasks, forklifts, seed)
+    samples: Dict[str, List[float]] = {}
+    peaks: Dict[str, int] = {}
+
+    def timer(name: str, fn: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        result = fn()
+        samples.setdefault(name, []).append(time.perf_counter() - started)
+        return result
+
+    def tracer(name: str, fn: Callable[[], Any]) -> Any:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        result = fn()
+        peaks[name] = max(0, tracemalloc.get_traced_memory()[1] - base)
+        return result
+
+    for _ in range(repeat):
+        run_round(case, optimizers, seed, timer)
+    tracemalloc.start()
+    try:
+        run_round(case, optimizers, seed, tracer)
+    finally:
+        tracemalloc.stop()
+    return {
+        "name": f"{width}x{height}-r{robots}-t{tasks}-m{forklifts}",
+        "seed": seed,
+        "width": width,
+        "height": height,
+        "robots": len(case["robots"]),
+        "tasks": len(case["tasks"]),
+        "moving": len(case["moving"]),
+        "wall_density": case["density"],
+        "stages": {name: summarize(times, peaks.get(name, 0)) for name, times in samples.items()},
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Add ``p50_vs_baseline`` (this run's p50 over the baseline's; below 1 is faster) to matching stages."""
+    previous = {case["name"]: case["stages"] for case in baseline.get("cases", [])}
+    for case in report["cases"]:
+        for name, stage in case["stages"].items():
+            before = previous.get(case["name"], {}).get(name)
+            if before and before.get("p50_ms"):
+                stage["p50_vs_baseline"] = stage["p50_ms"] / before["p50_ms"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="only the small cases")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--optimizers", default=",".join(DEFAULT_OPTIMIZERS), help=f"any of {', '.join(OPTIMIZERS)}")
+    parser.add_argument("--output", help="write the report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier report to compare p50s against")
+    args = parser.parse_args()
+    optimizers = [name for name in args.optimizers.split(",") if name in OPTIMIZERS]
+    cases = QUICK_CASES if args.quick else CASES
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "json_engine": ENGINE,
+        "repeat": args.repeat,
+        "optimizers": optimizers,
+        "cases": [bench_case(spec, args.seed + idx, optimizers, max(1, args.repeat)) for idx, spec in enumerate(cases)],
+    }
+    if args.baseline:
+        with open(args.baseline) as handle:
+            compare(report, json.load(handle))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
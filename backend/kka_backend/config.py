@@ -1,4 +1,5 @@
 import os
+import tempfile
 from typing import Tuple
 
 
@@ -58,6 +59,23 @@ DEFAULT_MOVING_RANGE = _int_range("DEFAULT_MOVING_RANGE", (3, 10))
 DEFAULT_ROBOT_RANGE = _int_range("DEFAULT_ROBOT_RANGE", (2, 5))
 FORKLIFT_PATH_MIN = _int("FORKLIFT_PATH_MIN", 20)
 FORKLIFT_PATH_MAX = _int("FORKLIFT_PATH_MAX", 100)
+PATH_CACHE_MAX_BYTES = _int("PATH_CACHE_MAX_BYTES", 128 * 1024 * 1024)
+CBS_MAX_NODES = _int("CBS_MAX_NODES", 2000)
+GA_ISLANDS = _int("GA_ISLANDS", os.cpu_count() or 1)
+GA_MIGRATION_INTERVAL = _int("GA_MIGRATION_INTERVAL", 25)
+GA_MIGRANTS = _int("GA_MIGRANTS", 2)
+BATCH_WORKERS = _int("BATCH_WORKERS", os.cpu_count() or 1)
+BATCH_MAX_SCENARIOS = _int("BATCH_MAX_SCENARIOS", 256)
+JOB_WORKERS = _int("JOB_WORKERS", 2)
+JOB_QUEUE_LIMIT = _int("JOB_QUEUE_LIMIT", 16)
+PROGRESS_STREAM_HZ = _float("PROGRESS_STREAM_HZ", 10.0)
+PROGRESS_STREAM_MAX_SECONDS = _float("PROGRESS_STREAM_MAX_SECONDS", 120.0)
+PROGRESS_STORE = (os.getenv("PROGRESS_STORE") or "memory").strip().lower()
+PROGRESS_DB_PATH = os.getenv("PROGRESS_DB_PATH") or os.path.join(tempfile.gettempdir(), "kka_progress.sqlite3")
+PROGRESS_TTL_SECONDS = _float("PROGRESS_TTL_SECONDS", 3600.0)
+METRICS_ENABLED = _int("METRICS_ENABLED", 1)
+PROFILING_ENABLED = _int("PROFILING_ENABLED", 0)
+PROFILE_SAMPLE_MS = _float("PROFILE_SAMPLE_MS", 5.0)
 
 _colors = os.getenv("ROBOT_COLORS")
 if _colors:
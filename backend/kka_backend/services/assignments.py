@@ -1,10 +1,20 @@
+import heapq
 import math
 import random
 from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
 
+import numpy as np
+
 from kka_backend.config import ROBOT_COLORS
+from kka_backend.services.genetic import next_generation, population_fitness, random_population
+from kka_backend.services.metrics import metrics
 from kka_backend.services.paths import PathLibrary
+from kka_backend.services.routes import Routes
+from kka_backend.services.task_costs import Objective, TaskCosts
 from kka_backend.utils.geometry import euclidean
+from kka_backend.utils.deadline import Deadline
+from kka_backend.utils.grid import Grid
+from kka_backend.utils.matching import min_cost_matching
 
 ProgressCallback = Optional[Callable[[str, Dict[str, Any]], None]]
 
@@ -18,27 +28,19 @@ def analyze_reachability(
         return [], [], list(tasks), []
     if not tasks:
         return list(robots), [], [], []
-    reachable_tasks: Set[Tuple[int, int]] = set()
-    active: List[Tuple[int, int]] = []
-    inactive: List[Tuple[int, int]] = []
-    for robot in robots:
-        robot_has_path = False
-        for task in tasks:
-            info = planner.ensure(robot, task)
-            if info.get("path"):
-                robot_has_path = True
-                reachable_tasks.add(task)
-        if robot_has_path:
-            active.append(robot)
-        else:
-            inactive.append(robot)
+    matrix = planner.cost_matrix(robots, tasks)
+    reachable = np.isfinite(matrix)
+    robot_ok = reachable.any(axis=1)
+    active = [robot for robot, ok in zip(robots, robot_ok) if ok]
+    inactive = [robot for robot, ok in zip(robots, robot_ok) if not ok]
+    reachable_tasks = {task for task, ok in zip(tasks, reachable.any(axis=0)) if ok}
     assignable_tasks = [task for task in tasks if task in reachable_tasks]
     unreachable_tasks = [task for task in tasks if task not in reachable_tasks]
     return active, inactive, assignable_tasks, unreachable_tasks
 
 
 def greedy_assign(
-    grid: List[List[int]],
+    grid: Grid,
     robots: Sequence[Tuple[int, int]],
     tasks: Sequence[Tuple[int, int]],
     alg: str,
@@ -61,6 +63,7 @@ def greedy_assign(
                 },
             )
 
+    planner.prepare(list(robots) + list(tasks))
     remaining = list(tasks)
     assigned = {r: [] for r in robots}
     robot_pos = {r: r for r in robots}
@@ -93,95 +96,143 @@ def greedy_assign(
     return assigned
 
 
-def ga_assign(
-    grid: List[List[int]],
+def pq_greedy_assign(
+    grid: Grid,
     robots: Sequence[Tuple[int, int]],
     tasks: Sequence[Tuple[int, int]],
     alg: str,
     planner: PathLibrary,
-    pop: int = 40,
-    gens: int = 80,
-    pmut: float = 0.3,
     progress_cb: ProgressCallback = None,
 ) -> Dict[Tuple[int, int], List[Tuple[int, int]]]:
-    if not tasks:
+    """Greedy on true path cost: repeatedly commit the cheapest (robot, next task) pair overall.
+
+    Each robot keeps its candidate tasks sorted by cost from where it stands and has one entry in a
+    heap. Taking a task only re-sorts the chosen robot's row; the others skip taken tasks lazily.
+    """
+    if not tasks or not robots:
         return {r: [] for r in robots}
-    rng = random.Random()
-    num_robots = len(robots)
-    greedy_seed = greedy_assign(grid, robots, tasks, alg, planner)
-    greedy_flat: List[Tuple[int, int]] = []
-    for r in robots:
-        greedy_flat.extend(greedy_seed.get(r, []))
-    if not greedy_flat:
-        greedy_flat = list(tasks)
+    costs = TaskCosts.build(robots, tasks, planner)
+    total_tasks = len(tasks)
+    taken = [False] * total_tasks
+    routes: List[List[int]] = [[] for _ in robots]
+    candidates: List[Tuple[List[int], List[float]]] = [([], [])] * len(robots)
+    cursor = [0] * len(robots)
+    heap: List[Tuple[float, int, int]] = []
 
-    def split_chrom(chrom: Sequence[Tuple[int, int]]) -> List[List[Tuple[int, int]]]:
-        n = len(chrom)
-        sizes = [n // num_robots] * num_robots
-        for i in range(n % num_robots):
-            sizes[i] += 1
-        out = []
-        idx = 0
-        for s in sizes:
-            out.append(list(chrom[idx : idx + s]))
-            idx += s
-        return out
+    def push_next(robot: int) -> None:
+        order, row = candidates[robot]
+        k = cursor[robot]
+        while k < len(order) and taken[order[k]]:
+            k += 1
+        cursor[robot] = k
+        if k < len(order) and row[order[k]] != math.inf:
+            heapq.heappush(heap, (row[order[k]], robot, order[k]))
 
-    fitness_cache: Dict[Tuple[Tuple[int, int], ...], float] = {}
+    def restart(robot: int, row: np.ndarray) -> None:
+        candidates[robot] = (np.argsort(row, kind="stable").tolist(), row.tolist())
+        cursor[robot] = 0
+        push_next(robot)
 
-    def fitness(chrom: Sequence[Tuple[int, int]]) -> float:
-        key = tuple(chrom)
-        if key in fitness_cache:
-            return fitness_cache[key]
-        parts = split_chrom(chrom)
-        total = 0.0
-        for robot_idx, r in enumerate(robots):
-            cur = r
-            for t in parts[robot_idx]:
-                total += planner.cost(cur, t)
-                cur = t
-        fitness_cache[key] = total
-        return total
+    for robot in range(len(robots)):
+        restart(robot, costs.start[robot])
+    completed = 0
+    while heap:
+        _, robot, task = heapq.heappop(heap)
+        if taken[task]:
+            push_next(robot)
+            continue
+        taken[task] = True
+        routes[robot].append(task)
+        completed += 1
+        if progress_cb:
+            progress_cb(
+                "greedy_assign",
+                {
+                    "robot": robots[robot],
+                    "task": tasks[task],
+                    "completed": completed,
+                    "total": total_tasks,
+                    "remaining": total_tasks - completed,
+                },
+            )
+        restart(robot, costs.legs[task])
+    return costs.from_routes(routes)
 
-    def random_chrom() -> List[Tuple[int, int]]:
-        perm = list(tasks)
-        rng.shuffle(perm)
-        return perm
 
-    def ordered_crossover(a: Sequence[Tuple[int, int]], b: Sequence[Tuple[int, int]]) -> List[Tuple[int, int]]:
-        if len(a) < 2:
-            return list(a)
-        i, j = sorted(rng.sample(range(len(a)), 2))
-        child: List[Optional[Tuple[int, int]]] = [None] * len(a)
-        child[i : j + 1] = a[i : j + 1]
-        fill_idx = (j + 1) % len(a)
-        for candidate in b:
-            if candidate in child:
-                continue
-            child[fill_idx] = candidate
-            fill_idx = (fill_idx + 1) % len(a)
-        return [step for step in child if step is not None]
+def hungarian_assign(
+    grid: Grid,
+    robots: Sequence[Tuple[int, int]],
+    tasks: Sequence[Tuple[int, int]],
+    alg: str,
+    planner: PathLibrary,
+    progress_cb: ProgressCallback = None,
+) -> Dict[Tuple[int, int], List[Tuple[int, int]]]:
+    """Round-based assignment: every round gives each robot at most one more task.
 
-    def mutate(chrom: List[Tuple[int, int]]):
-        if len(chrom) < 2:
-            return
-        i, j = sorted(rng.sample(range(len(chrom)), 2))
-        if rng.random() < 0.5:
-            chrom[i], chrom[j] = chrom[j], chrom[i]
-        else:
-            segment = chrom[i:j]
-            rng.shuffle(segment)
-            chrom[i:j] = segment
+    A round is an optimal min-cost matching between the robots' current positions and the remaining
+    tasks on the real path-cost matrix, after which each matched robot moves to its task.
+    """
+    if not tasks or not robots:
+        return {r: [] for r in robots}
+    costs = TaskCosts.build(robots, tasks, planner)
+    rows = costs.start.copy()
+    remaining = np.arange(len(tasks))
+    routes: List[List[int]] = [[] for _ in robots]
+    round_idx = 0
+    while remaining.size:
+        pairs = min_cost_matching(rows[:, remaining])
+        if not pairs:
+            break
+        round_idx += 1
+        for robot, col in pairs:
+            task = int(remaining[col])
+            routes[robot].append(task)
+            rows[robot] = costs.legs[task]
+        remaining = np.delete(remaining, [col for _, col in pairs])
+        if progress_cb:
+            progress_cb(
+                "assignment_round",
+                {
+                    "round": round_idx,
+                    "assigned": len(pairs),
+                    "completed": len(tasks) - remaining.size,
+                    "total": len(tasks),
+                },
+            )
+    return costs.from_routes(routes)
 
-    def tournament(population: List[List[Tuple[int, int]]], k: int = 3) -> List[Tuple[int, int]]:
-        contenders = rng.sample(population, min(k, len(population)))
-        return min(contenders, key=fitness)
 
-    population: List[List[Tuple[int, int]]] = [greedy_flat[:]]
-    while len(population) < pop:
-        population.append(random_chrom())
+def ga_assign(
+    grid: Grid,
+    robots: Sequence[Tuple[int, int]],
+    tasks: Sequence[Tuple[int, int]],
+    alg: str,
+    planner: PathLibrary,
+    pop: int = 40,
+    gens: int = 80,
+    pmut: float = 0.3,
+    progress_cb: ProgressCallback = None,
+    seed: Optional[int] = None,
+    objective: Optional[Objective] = None,
+    deadline: Optional[Deadline] = None,
+) -> Dict[Tuple[int, int], List[Tuple[int, int]]]:
+    if not tasks or not robots:
+        return {r: [] for r in robots}
+    rng = np.random.default_rng(seed)
+    pop = max(2, pop)
+    objective = objective or Objective()
+    costs = TaskCosts.build(robots, tasks, planner)
+    greedy_seed = greedy_assign(grid, robots, tasks, alg, planner)
+
+    population = random_population(pop, costs.genes, rng)
+    population[0] = costs.chromosome(greedy_seed)
+    fitness = population_fitness(population, costs, objective)
 
+    evolved = 0
     for generation in range(1, gens + 1):
+        if deadline is not None and deadline.expired():
+            metrics.inc("kka_search_cutoffs_total", stage="ga")
+            break
         if progress_cb:
             progress_cb(
                 "ga_generation",
@@ -191,112 +242,99 @@ def ga_assign(
                     "total_generations": gens,
                 },
             )
-        next_population: List[List[Tuple[int, int]]] = []
-        elite = min(population, key=fitness)
-        if progress_cb:
             progress_cb(
                 "ga_generation",
                 {
                     "phase": "end",
                     "generation": generation,
                     "total_generations": gens,
-                    "best_cost": fitness(elite),
+                    "best_cost": float(fitness.min()),
+                },
+            )
+        population, fitness = next_generation(population, fitness, costs, objective, rng, pmut)
+        evolved += 1
+        if progress_cb:
+            progress_cb(
+                "ga_generation_step",
+                {
+                    "generation": generation,
+                    "total_generations": gens,
+                    "produced": pop - 1,
+                    "population": pop,
                 },
             )
-        next_population.append(elite[:])
-        produced = 0
-        emit_every = max(1, pop // 5)
-        while len(next_population) < pop:
-            parent1 = tournament(population)
-            parent2 = tournament(population)
-            child = ordered_crossover(parent1, parent2)
-            if rng.random() < pmut:
-                mutate(child)
-            next_population.append(child)
-            produced += 1
-            if progress_cb and (produced == pop - 1 or produced % emit_every == 0):
-                progress_cb(
-                    "ga_generation_step",
-                    {
-                        "generation": generation,
-                        "total_generations": gens,
-                        "produced": produced,
-                        "population": pop,
-                    },
-                )
-        population = next_population
 
-    best = min(population, key=fitness)
-    parts = split_chrom(best)
-    result = {}
-    for idx, r in enumerate(robots):
-        result[r] = parts[idx]
-    return result
+    metrics.inc("kka_ga_generations_total", evolved, optimizer="ga")
+    best = population[int(fitness.argmin())]
+    return costs.decode(best.tolist())
 
 
 def local_search_assign(
-    grid: List[List[int]],
+    grid: Grid,
     robots: Sequence[Tuple[int, int]],
     tasks: Sequence[Tuple[int, int]],
     alg: str,
     planner: PathLibrary,
     iters: int = 2000,
     progress_cb: ProgressCallback = None,
+    seed: Optional[int] = None,
+    objective: Optional[Objective] = None,
+    deadline: Optional[Deadline] = None,
 ) -> Dict[Tuple[int, int], List[Tuple[int, int]]]:
     assigned = greedy_assign(grid, robots, tasks, alg, planner)
-    flat = []
-    for r in robots:
-        flat.extend(assigned.get(r, []))
-    if not flat:
+    if not any(assigned.values()):
         return assigned
-    rng = random.Random()
-    current = flat[:]
-
-    def split(chrom: Sequence[Tuple[int, int]]) -> List[List[Tuple[int, int]]]:
-        n = len(chrom)
-        num_robots = len(robots)
-        sizes = [n // num_robots] * num_robots
-        for i in range(n % num_robots):
-            sizes[i] += 1
-        idx = 0
-        parts = []
-        for s in sizes:
-            parts.append(list(chrom[idx : idx + s]))
-            idx += s
-        return parts
-
-    def score(chrom: Sequence[Tuple[int, int]]) -> float:
-        parts = split(chrom)
-        total = 0.0
-        for robot_idx, r in enumerate(robots):
-            cur = r
-            for t in parts[robot_idx]:
-                total += planner.cost(cur, t)
-                cur = t
-        return total
-
-    current_score = score(current)
-    best = current[:]
+    rng = random.Random(seed)
+    objective = objective or Objective()
+    costs = TaskCosts.build(robots, tasks, planner)
+    state = Routes(costs, costs.routes(assigned))
+    current_score = objective.score(state.loads)
+    best = state.copy_routes()
     best_score = current_score
+    num_robots = len(robots)
 
     report_every = max(1, iters // 100)
 
+    evaluated = 0
     for iteration in range(1, iters + 1):
-        candidate = current[:]
-        if len(candidate) >= 2:
-            i, j = rng.sample(range(len(candidate)), 2)
-            candidate[i], candidate[j] = candidate[j], candidate[i]
-        if rng.random() < 0.25 and len(candidate) >= 3:
-            i, j = sorted(rng.sample(range(len(candidate)), 2))
-            segment = candidate[i:j]
-            candidate[i:j] = list(reversed(segment))
-        val = score(candidate)
-        if val < current_score or rng.random() < 0.05:
-            current = candidate
-            current_score = val
-            if val < best_score:
-                best = candidate
-                best_score = val
+        if deadline is not None and deadline.expired():
+            metrics.inc("kka_search_cutoffs_total", stage="local")
+            break
+        evaluated += 1
+        filled = [r for r, route in enumerate(state.routes) if route]
+        a = rng.choice(filled)
+        size = len(state.routes[a])
+        i = rng.randrange(size)
+        roll = rng.random()
+        move = None
+        if roll < 0.3:
+            b = rng.choice(filled)
+            j = rng.randrange(len(state.routes[b]))
+            if a != b or i != j:
+                move = (state.swap_delta, state.apply_swap, (a, i, b, j))
+        elif roll < 0.55:
+            if size >= 2:
+                i, j = sorted(rng.sample(range(size), 2))
+                move = (state.reverse_delta, state.apply_reverse, (a, i, j))
+        elif roll < 0.8 or num_robots == 1:
+            length = rng.randint(1, min(3, size - i))
+            j = rng.randint(0, size - length)
+            if j != i:
+                move = (state.move_delta, state.apply_move, (a, i, length, a, j))
+        else:
+            b = rng.randrange(num_robots - 1)
+            b += b >= a
+            move = (state.move_delta, state.apply_move, (a, i, 1, b, rng.randint(0, len(state.routes[b]))))
+        if move is not None:
+            delta_fn, apply_fn, args = move
+            deltas = delta_fn(*args)
+            val = objective.score([load + deltas.get(r, 0.0) for r, load in enumerate(state.loads)])
+            if math.isfinite(val) and (val < current_score or rng.random() < 0.05):
+                apply_fn(*args, deltas)
+                current_score = val
+                if val < best_score:
+                    best = state.copy_routes()
+                    best_score = val
         if progress_cb and (iteration == 1 or iteration == iters or iteration % report_every == 0):
             progress_cb(
                 "local_search_iteration",
@@ -308,11 +346,8 @@ def local_search_assign(
                 },
             )
 
-    parts = split(best)
-    out = {}
-    for idx, r in enumerate(robots):
-        out[r] = parts[idx]
-    return out
+    metrics.inc("kka_local_search_iterations_total", evaluated)
+    return costs.from_routes(best)
 
 
 def compile_task_assignments(
@@ -333,7 +368,7 @@ def compile_task_assignments(
             legs.append(
                 {
                     "order": order,
-                    "task": list(task),
+                    "task": task,
                     "cost": info["cost"],
                     "path": info["path"],
                 }
@@ -342,7 +377,7 @@ def compile_task_assignments(
             cur = task
             task_map[f"{task[0]},{task[1]}"] = {
                 "robot_index": idx,
-                "robot_start": list(robot),
+                "robot_start": robot,
                 "order": order,
                 "color": color,
                 "cost": info["cost"],
@@ -351,7 +386,7 @@ def compile_task_assignments(
             {
                 "id": idx,
                 "color": color,
-                "start": list(robot),
+                "start": robot,
                 "assignments": legs,
                 "total_cost": total_cost,
             }
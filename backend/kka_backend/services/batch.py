@@ -0,0 +1,153 @@
+import json
+import math
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Any, Dict, Iterator, List, Tuple
+
+from kka_backend.config import BATCH_WORKERS
+from kka_backend.services.pipeline import run_compute_paths, run_generate_map, run_plan_tasks
+from kka_backend.services.pools import process_pool, reset_pool
+from kka_backend.utils.grid import Grid, normalize_grid
+
+Scenario = Dict[str, Any]
+
+MAP_FIELDS = ("grid", "robots", "tasks", "moving")
+
+
+def run_scenario(scenario: Scenario) -> Dict[str, Any]:
+    """Generate (unless a grid is given), plan and schedule one scenario; returns its NDJSON row."""
+    scenario = {key: value for key, value in scenario.items() if key not in ("progress_id", "async")}
+    row: Dict[str, Any] = {"label": scenario.get("label")}
+    if scenario.get("grid") is None:
+        generated = run_generate_map(scenario)
+        scenario.update({field: generated[field] for field in MAP_FIELDS})
+        row["meta"] = generated["meta"]
+        if scenario.get("full"):
+            row["map"] = generated
+    plan = run_plan_tasks(scenario)
+    row["plan"] = plan if scenario.get("full") else {"assigned": plan["assigned"], "metrics": plan["metrics"]}
+    if scenario.get("compute_paths", True):
+        paths = run_compute_paths(
+            dict(
+                scenario,
+                robot_plans=plan["assigned"],
+                alg=scenario.get("path_alg", "astar"),
+            )
+        )
+        if scenario.get("full") or not paths.get("ok"):
+            row["paths"] = paths
+        else:
+            schedule = paths.get(paths["scheduler"]) or {}
+            row["paths"] = {
+                "ok": paths["ok"],
+                "scheduler": paths["scheduler"],
+                "schedule_ok": schedule.get("ok"),
+                "makespan": max((len(path) - 1 for path in paths["scheduled_paths"].values()), default=0),
+                "timing": paths["timing"],
+                "metrics": paths["metrics"],
+            }
+    return row
+
+
+def run_chunk(items: List[Tuple[int, Scenario]]) -> List[Dict[str, Any]]:
+    """Worker entry point: run scenarios in order so those sharing a grid reuse this process's path cache."""
+    rows = []
+    for index, scenario in items:
+        started = time.perf_counter()
+        try:
+            row = {"index": index, "ok": True, **run_scenario(scenario)}
+        except Exception as exc:
+            row = {"index": index, "ok": False, "label": scenario.get("label"), "error": str(exc)}
+        row["elapsed_ms"] = (time.perf_counter() - started) * 1000.0
+        rows.append(row)
+    return rows
+
+
+def _map_key(scenario: Scenario) -> Tuple:
+    grid = scenario.get("grid")
+    if isinstance(grid, Grid):
+        return ("grid", grid.fingerprint())
+    if scenario.get("seed") is None:
+        return ("random", id(scenario))
+    fields = ("seed", "width", "height", "wall_density_range")
+    return ("generated",) + tuple(json.dumps(scenario.get(field), sort_keys=True) for field in fields)
+
+
+def plan_chunks(scenarios: List[Scenario], shared: Scenario, workers: int) -> List[List[Tuple[int, Scenario]]]:
+    """Merge ``shared`` into each scenario and cut the batch into per-worker chunks.
+
+    A scenario with a ``seed`` but no ``grid`` generates its own map instead of taking the shared one.
+    Scenarios on the same map (same grid, or same generation seed and size) are grouped, and a group
+    is spread over at most ``workers`` chunks so each worker builds that map's distance fields once.
+    """
+    grids: Dict[int, Grid] = {}
+    groups: Dict[Tuple, List[Tuple[int, Scenario]]] = {}
+    for index, raw in enumerate(scenarios):
+        raw = raw if isinstance(raw, dict) else {}
+        base = shared
+        if "seed" in raw and "grid" not in raw:
+            base = {key: value for key, value in shared.items() if key not in MAP_FIELDS}
+        scenario = dict(base, **raw)
+        grid = scenario.get("grid")
+        if grid is not None and not isinstance(grid, Grid):
+            if id(grid) not in grids:
+                grids[id(grid)] = normalize_grid(grid)
+            scenario["grid"] = grids[id(grid)]
+        groups.setdefault(_map_key(scenario), []).append((index, scenario))
+    chunks = []
+    for items in groups.values():
+        size = math.ceil(len(items) / max(1, workers))
+        chunks.extend(items[start : start + size] for start in range(0, len(items), size))
+    return chunks
+
+
+def run_batch(scenarios: List[Scenario], shared: Scenario, workers: int = BATCH_WORKERS) -> Iterator[Dict[str, Any]]:
+    """Rows for every scenario, as from ``stream_chunks``.
+
+    Chunks are planned before this returns, so a malformed grid raises ``GridFormatError`` here
+    rather than partway through the response.
+    """
+    return stream_chunks(plan_chunks(scenarios, shared, workers), len(scenarios), workers)
+
+
+def stream_chunks(chunks: List[List[Tuple[int, Scenario]]], total: int, workers: int) -> Iterator[Dict[str, Any]]:
+    """Yield one row per scenario as its chunk finishes, then a summary row with ``done`` set."""
+    started = time.perf_counter()
+    failed = 0
+    if workers <= 1:
+        for chunk in chunks:
+            for row in run_chunk(chunk):
+                failed += not row["ok"]
+                yield row
+    else:
+        pool = process_pool("batch", workers)
+        pending = {pool.submit(run_chunk, chunk): chunk for chunk in chunks}
+        broken = False
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = pending.pop(future)
+                    try:
+                        rows = future.result()
+                    except Exception as exc:
+                        broken = True
+                        rows = [
+                            {"index": index, "ok": False, "label": item.get("label"), "error": str(exc)}
+                            for index, item in chunk
+                        ]
+                    for row in rows:
+                        failed += not row["ok"]
+                        yield row
+        finally:
+            # A client that disconnects closes this generator; chunks not started yet are dropped.
+            for future in pending:
+                future.cancel()
+            if broken:
+                reset_pool("batch")
+    yield {
+        "done": True,
+        "scenarios": total,
+        "failed": failed,
+        "elapsed_ms": (time.perf_counter() - started) * 1000.0,
+    }
@@ -0,0 +1,223 @@
+import heapq
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from kka_backend.services.metrics import metrics
+from kka_backend.services.paths import PathLibrary, space_time_astar
+from kka_backend.services.scheduling import ObstacleIndex, ProgressCallback
+from kka_backend.utils.deadline import Deadline
+from kka_backend.utils.grid import Grid
+
+Constraints = Tuple[frozenset, frozenset]
+
+
+def find_conflicts(paths: Dict[Any, List[int]]) -> Tuple[Optional[tuple], int]:
+    """First vertex/swap conflict between robot paths and the total number of conflicts.
+
+    A robot stops occupying cells once its path ends, matching ``csp_schedule``.
+    """
+    first = None
+    count = 0
+    robots = list(paths)
+    horizon = max((len(p) for p in paths.values()), default=0)
+    for t in range(horizon):
+        occupied: Dict[int, Any] = {}
+        moves: Dict[Tuple[int, int], Any] = {}
+        for robot in robots:
+            path = paths[robot]
+            if t >= len(path):
+                continue
+            cell = path[t]
+            other = occupied.get(cell)
+            if other is not None:
+                count += 1
+                if first is None:
+                    first = ("vertex", other, robot, cell, t)
+            else:
+                occupied[cell] = robot
+            if t + 1 < len(path) and path[t + 1] != cell:
+                step = (cell, path[t + 1])
+                other = moves.get((step[1], step[0]))
+                if other is not None:
+                    count += 1
+                    if first is None:
+                        first = ("edge", other, robot, step, t)
+                moves[step] = robot
+    return first, count
+
+
+def _split(conflict: tuple) -> List[Tuple[Any, str, tuple]]:
+    kind, first, second, where, t = conflict
+    if kind == "vertex":
+        return [(first, "vertex", (where, t)), (second, "vertex", (where, t))]
+    a, b = where
+    return [(first, "edge", (b, a, t)), (second, "edge", (a, b, t))]
+
+
+@metrics.timed("kka_stage_seconds", stage="cbs_schedule")
+def cbs_schedule(
+    grid: Grid,
+    robot_plans: Dict[Tuple[int, int], Sequence[Tuple[int, int]]],
+    obstacles: ObstacleIndex,
+    library: PathLibrary,
+    max_offset: int = 40,
+    max_nodes: int = 2000,
+    progress_cb: Optional[ProgressCallback] = None,
+    deadline: Optional[Deadline] = None,
+):
+    """Conflict-Based Search over space-time A* paths.
+
+    Forklifts from ``obstacles`` are hard constraints for the low level,
+    which also prefers, among equally short paths, the one crossing the fewest other robots.
+    The constraint tree is ordered by sum of costs, then by remaining conflicts, and each robot may
+    spend at most ``max_offset`` steps beyond its static shortest route. When ``max_nodes`` or the
+    ``deadline`` runs out the node with the fewest conflicts is returned with ``ok`` set to ``False``.
+    """
+    robots = list(robot_plans.keys())
+    lower = {}
+    for robot in robots:
+        steps = 0
+        cur = robot
+        for goal in robot_plans[robot]:
+            cost = library.cost(cur, goal)
+            steps += int(cost) if cost != float("inf") else 0
+            cur = goal
+        lower[robot] = steps
+    horizon = max(lower.values(), default=0) + max_offset
+    empty: Constraints = (frozenset(), frozenset())
+    low_level_nodes = 0
+    expanded = 0
+    generated = 0
+    last_emit = 0
+    emit_interval = max(10, len(robots) * 4)
+
+    def emit(stage: str, payload: dict | None = None):
+        if progress_cb is None:
+            return
+        data = {
+            "stage": stage,
+            "robots": len(robots),
+            "nodes_expanded": expanded,
+            "nodes_generated": generated,
+            "max_nodes": max_nodes,
+            "horizon": horizon,
+        }
+        if payload:
+            data.update(payload)
+        progress_cb(stage, data)
+
+    def plan(
+        robot: Tuple[int, int],
+        constraints: Constraints,
+        others: Dict[Any, List[int]],
+    ) -> Optional[List[int]]:
+        nonlocal low_level_nodes
+        vertex_cons, edge_cons = constraints
+        occupied: Dict[Tuple[int, int], int] = {}
+        moving: Set[Tuple[int, int, int]] = set()
+        for other, path in others.items():
+            if other == robot:
+                continue
+            for t, idx in enumerate(path):
+                occupied[(idx, t)] = occupied.get((idx, t), 0) + 1
+                if t + 1 < len(path) and path[t + 1] != idx:
+                    moving.add((path[t + 1], idx, t))
+
+        def vertex_blocked(idx: int, t: int) -> bool:
+            return (idx, t) in vertex_cons or obstacles.occupied(idx, t)
+
+        def edge_blocked(a: int, b: int, t: int) -> bool:
+            return (a, b, t) in edge_cons or obstacles.swap(a, b, t)
+
+        def penalty(a: int, b: int, t: int) -> int:
+            return occupied.get((b, t + 1), 0) + ((a, b, t) in moving)
+
+        path, nodes = space_time_astar(
+            grid,
+            robot,
+            robot_plans[robot],
+            library,
+            horizon=lower[robot] + max_offset,
+            vertex_blocked=vertex_blocked,
+            edge_blocked=edge_blocked,
+            penalty=penalty if others else None,
+        )
+        low_level_nodes += nodes
+        if not path:
+            return None
+        return [grid.cell_id(cell) for cell in path]
+
+    emit("start")
+    root_paths: Dict[Any, List[int]] = {}
+    unplanned: List[Tuple[int, int]] = []
+    for robot in robots:
+        path = plan(robot, empty, root_paths)
+        if path is None:
+            unplanned.append(robot)
+        else:
+            root_paths[robot] = path
+    conflict, count = find_conflicts(root_paths)
+    root = {
+        "paths": root_paths,
+        "constraints": {},
+        "cost": sum(len(p) - 1 for p in root_paths.values()),
+        "conflict": conflict,
+        "count": count,
+    }
+    best = root
+    heap: List[Tuple[int, int, int, dict]] = [(root["cost"], count, 0, root)]
+    solved = None
+    while heap and expanded < max_nodes:
+        if deadline is not None and deadline.expired():
+            break
+        _, _, _, node = heapq.heappop(heap)
+        expanded += 1
+        if node["count"] < best["count"]:
+            best = node
+        if node["conflict"] is None:
+            solved = node
+            break
+        if expanded - last_emit >= emit_interval:
+            last_emit = expanded
+            emit("search_tick", {"conflicts": best["count"]})
+        for robot, kind, item in _split(node["conflict"]):
+            vertex_cons, edge_cons = node["constraints"].get(robot, empty)
+            if kind == "vertex":
+                vertex_cons = vertex_cons | {item}
+            else:
+                edge_cons = edge_cons | {item}
+            child_cons = dict(node["constraints"])
+            child_cons[robot] = (vertex_cons, edge_cons)
+            path = plan(robot, child_cons[robot], node["paths"])
+            if path is None:
+                continue
+            child_paths = dict(node["paths"])
+            child_paths[robot] = path
+            conflict, count = find_conflicts(child_paths)
+            generated += 1
+            child = {
+                "paths": child_paths,
+                "constraints": child_cons,
+                "cost": node["cost"] - (len(node["paths"][robot]) - 1) + (len(path) - 1),
+                "conflict": conflict,
+                "count": count,
+            }
+            heapq.heappush(heap, (child["cost"], count, generated, child))
+    result = solved or best
+    ok = solved is not None and not unplanned
+    emit("done", {"ok": ok, "conflicts": result["count"]})
+    paths = {robot: [grid.coords(idx) for idx in path] for robot, path in result["paths"].items()}
+    metrics.inc("kka_cbs_nodes_total", expanded)
+    if deadline is not None and deadline.cut_off:
+        metrics.inc("kka_search_cutoffs_total", stage="cbs")
+    return {
+        "ok": ok,
+        "paths": paths,
+        "unplanned": unplanned,
+        "conflicts": result["count"],
+        "nodes": expanded,
+        "generated": generated,
+        "cut_off": bool(deadline is not None and deadline.cut_off),
+        "low_level_nodes": low_level_nodes,
+        "sum_of_costs": result["cost"],
+        "makespan": max((len(p) - 1 for p in paths.values()), default=0),
+    }
@@ -0,0 +1,104 @@
+from typing import Tuple
+
+import numpy as np
+
+from kka_backend.services.task_costs import Objective, TaskCosts
+
+
+def population_loads(population: np.ndarray, costs: TaskCosts) -> np.ndarray:
+    """Per-robot route cost for every row of a ``(pop, genes)`` chromosome matrix, as ``(pop, robots)``."""
+    count = population.shape[0]
+    num_robots, num_tasks = costs.start.shape
+    separator = population >= num_tasks
+    owner = np.cumsum(separator, axis=1) - separator
+    genes = np.where(separator, 0, population)
+    prev = np.zeros_like(genes)
+    prev[:, 1:] = genes[:, :-1]
+    opens = np.ones_like(separator)
+    opens[:, 1:] = separator[:, :-1]
+    legs = np.where(opens, costs.start[owner, genes], costs.legs[prev, genes])
+    legs[separator] = 0.0
+    slots = np.arange(count)[:, None] * num_robots + owner
+    return np.bincount(slots.ravel(), weights=legs.ravel(), minlength=count * num_robots).reshape(count, num_robots)
+
+
+def population_fitness(population: np.ndarray, costs: TaskCosts, objective: Objective) -> np.ndarray:
+    """Objective score of every chromosome, computed for the whole population in one pass."""
+    return objective.combine(population_loads(population, costs))
+
+
+def random_population(size: int, genes: int, rng: np.random.Generator) -> np.ndarray:
+    return rng.random((size, genes)).argsort(axis=1)
+
+
+def _cut_points(count: int, size: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    i = rng.integers(0, size, count)
+    j = rng.integers(0, size - 1, count)
+    j += j >= i
+    return np.minimum(i, j), np.maximum(i, j)
+
+
+def ordered_crossover(a: np.ndarray, b: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """OX on row pairs: keep a random slice of ``a``, fill the rest in ``b``'s order after the slice."""
+    count, size = a.shape
+    if size < 2:
+        return a.copy()
+    lo, hi = _cut_points(count, size, rng)
+    pos = np.arange(size)
+    keep = (pos >= lo[:, None]) & (pos <= hi[:, None])
+    child = np.where(keep, a, -1)
+    taken = np.zeros((count, size), dtype=bool)
+    taken[np.nonzero(keep)[0], a[keep]] = True
+    fill_values = b[~np.take_along_axis(taken, b, axis=1)]
+    order = (pos[None, :] + hi[:, None] + 1) % size
+    fill_pos = order[~np.take_along_axis(keep, order, axis=1)]
+    fill_rows = np.repeat(np.arange(count), size - (hi - lo + 1))
+    child[fill_rows, fill_pos] = fill_values
+    return child
+
+
+def mutate(children: np.ndarray, rng: np.random.Generator, pmut: float) -> None:
+    """In place: each row mutates with ``pmut``, by swapping two genes or shuffling a slice."""
+    count, size = children.shape
+    if size < 2:
+        return
+    hit = np.flatnonzero(rng.random(count) < pmut)
+    if not hit.size:
+        return
+    lo, hi = _cut_points(hit.size, size, rng)
+    swap = rng.random(hit.size) < 0.5
+    rows, i, j = hit[swap], lo[swap], hi[swap]
+    children[rows, i], children[rows, j] = children[rows, j], children[rows, i]
+    rows, i, j = hit[~swap], lo[~swap], hi[~swap]
+    if rows.size:
+        pos = np.arange(size)
+        inside = (pos >= i[:, None]) & (pos < j[:, None])
+        keys = np.where(inside, i[:, None] + rng.random((rows.size, size)) * (j - i)[:, None], pos)
+        children[rows] = np.take_along_axis(children[rows], keys.argsort(axis=1), axis=1)
+
+
+def tournament(fitness: np.ndarray, count: int, rng: np.random.Generator, k: int = 3) -> np.ndarray:
+    contenders = rng.integers(0, fitness.size, (count, k))
+    return contenders[np.arange(count), fitness[contenders].argmin(axis=1)]
+
+
+def next_generation(
+    population: np.ndarray,
+    fitness: np.ndarray,
+    costs: TaskCosts,
+    objective: Objective,
+    rng: np.random.Generator,
+    pmut: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Elitism plus tournament, OX and mutation for the remaining rows; returns the new fitness too."""
+    elite = int(fitness.argmin())
+    count = population.shape[0] - 1
+    children = ordered_crossover(
+        population[tournament(fitness, count, rng)],
+        population[tournament(fitness, count, rng)],
+        rng,
+    )
+    mutate(children, rng, pmut)
+    population = np.concatenate((population[elite : elite + 1], children))
+    fitness = np.concatenate((fitness[elite : elite + 1], population_fitness(children, costs, objective)))
+    return population, fitness
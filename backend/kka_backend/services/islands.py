@@ -0,0 +1,209 @@
+import os
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from kka_backend.config import GA_ISLANDS, GA_MIGRANTS, GA_MIGRATION_INTERVAL
+from kka_backend.services.assignments import ProgressCallback, ga_assign, greedy_assign
+from kka_backend.services.genetic import next_generation, population_fitness, random_population
+from kka_backend.services.metrics import metrics
+from kka_backend.services.paths import PathLibrary
+from kka_backend.services.pools import process_pool, reset_pool
+from kka_backend.services.task_costs import Objective, TaskCosts
+from kka_backend.utils.deadline import Deadline
+from kka_backend.utils.grid import Grid
+
+SharedArray = Tuple[str, Tuple[int, ...], str]
+
+
+def _share(array: np.ndarray) -> Tuple[shared_memory.SharedMemory, SharedArray]:
+    block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def evolve_island(
+    start: SharedArray,
+    legs: SharedArray,
+    objective: Objective,
+    population: np.ndarray,
+    fitness: np.ndarray,
+    generations: int,
+    pmut: float,
+    seed: int,
+    budget_ms: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Worker side: attach the shared cost matrices and run up to ``generations`` on one island.
+
+    Returns the evolved population, its fitness and how many generations ran before the budget.
+    """
+    deadline = Deadline.resume(budget_ms)
+    blocks = [shared_memory.SharedMemory(name=spec[0]) for spec in (start, legs)]
+    costs = None
+    try:
+        costs = TaskCosts(
+            (),
+            (),
+            *(np.ndarray(shape, np.dtype(dtype), buffer=block.buf) for (_, shape, dtype), block in zip((start, legs), blocks)),
+        )
+        rng = np.random.default_rng(seed)
+        evolved = 0
+        for _ in range(generations):
+            if deadline.expired():
+                break
+            population, fitness = next_generation(population, fitness, costs, objective, rng, pmut)
+            evolved += 1
+        return population, fitness, evolved
+    finally:
+        # Views into the blocks must go first, or close() raises BufferError over the real error.
+        del costs
+        for block in blocks:
+            block.close()
+
+
+def _migrate(populations: List[np.ndarray], fitnesses: List[np.ndarray], migrants: int) -> None:
+    """Ring migration: each island's best rows replace the worst rows of the next island."""
+    count = min(migrants, populations[0].shape[0] - 1)
+    if count <= 0 or len(populations) < 2:
+        return
+    elites = []
+    for population, fitness in zip(populations, fitnesses):
+        best = np.argsort(fitness, kind="stable")[:count]
+        elites.append((population[best].copy(), fitness[best].copy()))
+    for idx, (population, fitness) in enumerate(zip(populations, fitnesses)):
+        rows, values = elites[idx - 1]
+        worst = np.argsort(fitness, kind="stable")[-count:]
+        population[worst] = rows
+        fitness[worst] = values
+
+
+def island_ga_assign(
+    grid: Grid,
+    robots: Sequence[Tuple[int, int]],
+    tasks: Sequence[Tuple[int, int]],
+    alg: str,
+    planner: PathLibrary,
+    islands: int = GA_ISLANDS,
+    pop: int = 40,
+    gens: int = 80,
+    pmut: float = 0.3,
+    migrate_every: int = GA_MIGRATION_INTERVAL,
+    migrants: int = GA_MIGRANTS,
+    progress_cb: ProgressCallback = None,
+    seed: Optional[int] = None,
+    objective: Optional[Objective] = None,
+    deadline: Optional[Deadline] = None,
+) -> Dict[Tuple[int, int], List[Tuple[int, int]]]:
+    """``ga_assign`` split over ``islands`` subpopulations evolving in separate processes.
+
+    Islands run ``migrate_every`` generations per round against cost matrices placed in shared
+    memory, then exchange their ``migrants`` best chromosomes around a ring. Progress is reported
+    from this thread between rounds, so a cancelled job stops at the next migration.
+    """
+    if islands <= 1 or not tasks or not robots:
+        return ga_assign(
+            grid,
+            robots,
+            tasks,
+            alg,
+            planner,
+            pop=pop,
+            gens=gens,
+            pmut=pmut,
+            progress_cb=progress_cb,
+            seed=seed,
+            objective=objective,
+            deadline=deadline,
+        )
+    deadline = deadline or Deadline()
+    pop = max(2, pop)
+    migrate_every = max(1, migrate_every)
+    objective = objective or Objective()
+    costs = TaskCosts.build(robots, tasks, planner)
+    island_rngs = [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(islands)]
+    populations = [random_population(pop, costs.genes, rng) for rng in island_rngs]
+    populations[0][0] = costs.chromosome(greedy_assign(grid, robots, tasks, alg, planner))
+    fitnesses = [population_fitness(population, costs, objective) for population in populations]
+
+    blocks = []
+    try:
+        start_block, start_spec = _share(costs.start)
+        blocks.append(start_block)
+        legs_block, legs_spec = _share(costs.legs)
+        blocks.append(legs_block)
+        workers = max(1, min(islands, os.cpu_count() or 1))
+        pool_name = f"islands-{workers}"
+        pool = process_pool(pool_name, workers)
+        done = 0
+        evolved = 0
+        while done < gens and not deadline.expired():
+            span = min(migrate_every, gens - done)
+            if progress_cb:
+                progress_cb(
+                    "ga_generation",
+                    {
+                        "phase": "start",
+                        "generation": done + 1,
+                        "total_generations": gens,
+                        "islands": islands,
+                    },
+                )
+            futures = [
+                pool.submit(
+                    evolve_island,
+                    start_spec,
+                    legs_spec,
+                    objective,
+                    population,
+                    fitness,
+                    span,
+                    pmut,
+                    int(rng.integers(2**63)),
+                    deadline.remaining_ms(),
+                )
+                for population, fitness, rng in zip(populations, fitnesses, island_rngs)
+            ]
+            try:
+                results = [future.result() for future in futures]
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                reset_pool(pool_name)
+                raise
+            populations = [population for population, _, _ in results]
+            fitnesses = [fitness for _, fitness, _ in results]
+            evolved += sum(count for _, _, count in results)
+            done += span
+            _migrate(populations, fitnesses, migrants)
+            if progress_cb:
+                progress_cb(
+                    "ga_generation",
+                    {
+                        "phase": "end",
+                        "generation": done,
+                        "total_generations": gens,
+                        "best_cost": float(min(fitness.min() for fitness in fitnesses)),
+                        "islands": islands,
+                    },
+                )
+                progress_cb(
+                    "ga_generation_step",
+                    {
+                        "generation": done,
+                        "total_generations": gens,
+                        "produced": pop - 1,
+                        "population": pop,
+                    },
+                )
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    metrics.inc("kka_ga_generations_total", evolved, optimizer="ga_islands")
+    if deadline.cut_off:
+        metrics.inc("kka_search_cutoffs_total", stage="ga_islands")
+
+    best_island = min(range(islands), key=lambda idx: fitnesses[idx].min())
+    best = populations[best_island][int(fitnesses[best_island].argmin())]
+    return costs.decode(best.tolist())
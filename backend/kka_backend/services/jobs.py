@@ -0,0 +1,86 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from kka_backend.config import JOB_QUEUE_LIMIT, JOB_WORKERS
+from kka_backend.services.progress import JobCancelled, mark_failure, progress_registry
+
+FINAL_STATUSES = ("success", "error", "cancelled")
+
+
+class JobManager:
+    """Bounded worker pool running pipeline functions behind progress ids.
+
+    A job's id doubles as its progress id, so the usual progress callbacks report on it and
+    ``touch_progress`` stops it cooperatively once cancellation is requested.
+    """
+
+    def __init__(self, workers: int, queue_limit: int) -> None:
+        self.workers = max(1, workers)
+        self.queue_limit = max(1, queue_limit)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="kka-job")
+        return self._executor
+
+    def _prune(self) -> int:
+        # Caller holds ``_lock``.
+        self._futures = {job_id: fut for job_id, fut in self._futures.items() if not fut.done()}
+        return len(self._futures)
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._prune()
+
+    def submit(self, action: str, fn: Callable[[dict], Any], body: dict) -> Optional[Dict[str, Any]]:
+        """Queue ``fn(body)``; returns the progress entry, or ``None`` when the queue is full."""
+        with self._lock:
+            # Checked and filled under one lock so concurrent submits cannot overshoot the limit.
+            if self._prune() >= self.queue_limit:
+                return None
+            job_id = body.get("progress_id")
+            if not job_id or progress_registry.get(job_id) is None:
+                job_id = progress_registry.create(action=action)["id"]
+            progress_registry.queued(job_id)
+            job_body = dict(body, progress_id=job_id)
+            self._futures[job_id] = self._pool().submit(self._run, job_id, fn, job_body)
+        return progress_registry.get(job_id)
+
+    def _run(self, job_id: str, fn: Callable[[dict], Any], body: dict) -> None:
+        if progress_registry.cancel_requested(job_id):
+            progress_registry.cancelled(job_id)
+            return
+        progress_registry.update(job_id, status="running", message="Starting")
+        try:
+            result = fn(body)
+        except JobCancelled:
+            progress_registry.cancelled(job_id)
+        except Exception as exc:
+            mark_failure(job_id, str(exc))
+        else:
+            progress_registry.set_result(job_id, result)
+
+    def cancel(self, job_id: str) -> bool:
+        entry = progress_registry.get(job_id)
+        if not entry or entry["status"] in FINAL_STATUSES:
+            return False
+        progress_registry.request_cancel(job_id)
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            progress_registry.cancelled(job_id)
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "pending": self.pending(),
+        }
+
+
+job_manager = JobManager(JOB_WORKERS, JOB_QUEUE_LIMIT)
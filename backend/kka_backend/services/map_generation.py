@@ -1,35 +1,42 @@
 import random
 from typing import List, Optional, Sequence, Set, Tuple
 
+import numpy as np
+
 from kka_backend.config import (
     FORKLIFT_PATH_MAX,
     FORKLIFT_PATH_MIN,
     MAX_GENERATE_ATTEMPTS,
 )
+from kka_backend.services.metrics import metrics
 from kka_backend.utils.geometry import neighbors4
 from kka_backend.utils.grid import (
-    bfs_component,
+    Grid,
     ensure_perimeter_clear,
     get_free_cells,
     shortest_path,
+    wavefront,
 )
 from kka_backend.utils.numeric import clamp
 from kka_backend.utils.ranges import choose_from_range
 
 
+@metrics.timed("kka_stage_seconds", stage="generate_warehouse")
 def generate_warehouse(
     seed: Optional[int],
     width: int,
     height: int,
     density_bounds: Tuple[float, float],
-) -> Tuple[List[List[int]], float]:
+) -> Tuple[Grid, float]:
     rng = random.Random(seed)
-    best_grid: Optional[List[List[int]]] = None
+    best_grid: Optional[Grid] = None
     best_density: float = 0.0
     for _ in range(MAX_GENERATE_ATTEMPTS):
+        metrics.inc("kka_warehouse_attempts_total")
         density = clamp(choose_from_range(rng, density_bounds, integer=False), 0.02, 0.45)
-        grid = [[0 for _ in range(width)] for _ in range(height)]
+        grid = Grid(height, width)
         ensure_perimeter_clear(grid)
+        cells = grid.cells
         interior_columns = list(range(2, width - 2))
         rng.shuffle(interior_columns)
         shelf_columns = interior_columns[: max(1, int(len(interior_columns) * 0.4))]
@@ -39,22 +46,23 @@ def generate_warehouse(
                 if r in gaps:
                     continue
                 if rng.random() < 0.9:
-                    grid[r][c] = 1
+                    cells[r * width + c] = 1
         target_walls = int(width * height * density)
         attempts = 0
         while attempts < target_walls:
             r = rng.randrange(1, height - 1)
             c = rng.randrange(1, width - 1)
-            if grid[r][c] == 1:
+            if cells[r * width + c] == 1:
                 continue
-            grid[r][c] = 1
+            cells[r * width + c] = 1
             attempts += 1
         ensure_perimeter_clear(grid)
         free_cells = get_free_cells(grid)
         if not free_cells:
             continue
-        reachable = bfs_component(grid, free_cells[0])
-        ratio = len(reachable) / max(1, len(free_cells))
+        dist, _ = wavefront(grid.free_mask(), [free_cells[0]])
+        reachable = int(np.count_nonzero(dist >= 0))
+        ratio = reachable / max(1, len(free_cells))
         if ratio >= 0.65:
             actual_density = 1.0 - len(free_cells) / (width * height)
             return grid, actual_density
@@ -62,21 +70,19 @@ def generate_warehouse(
             best_grid = grid
             best_density = 1.0 - len(free_cells) / (width * height)
     if best_grid is None:
-        best_grid = [[0 for _ in range(width)] for _ in range(height)]
+        best_grid = Grid(height, width)
         ensure_perimeter_clear(best_grid)
     return best_grid, best_density
 
 
 def build_forklift_loop(
-    grid: List[List[int]],
+    grid: Grid,
     start: Tuple[int, int],
     rng: random.Random,
     min_len: int,
     max_len: int,
     blocked: Set[Tuple[int, int]],
 ) -> Optional[List[Tuple[int, int]]]:
-    height = len(grid)
-    width = len(grid[0]) if height else 0
     target_len = rng.randint(min_len, max_len)
     path = [start]
     blocked_local = set(blocked)
@@ -85,8 +91,8 @@ def build_forklift_loop(
     for _ in range(target_len - 1):
         choices = [
             nb
-            for nb in neighbors4(current, height, width)
-            if grid[nb[0]][nb[1]] == 0 and nb not in blocked_local
+            for nb in neighbors4(current, grid.height, grid.width)
+            if grid.is_free(nb) and nb not in blocked_local
         ]
         rng.shuffle(choices)
         if not choices:
@@ -109,15 +115,16 @@ def build_forklift_loop(
 
 
 def build_forklift_random_walk(
-    grid: List[List[int]],
+    grid: Grid,
     start: Tuple[int, int],
     rng: random.Random,
     min_len: int,
     max_len: int,
     blocked: Optional[Set[Tuple[int, int]]] = None,
 ) -> List[Tuple[int, int]]:
-    height = len(grid)
-    width = len(grid[0]) if height else 0
+    height = grid.height
+    width = grid.width
+    cells = grid.cells
     target_len = max(2, rng.randint(min_len, max_len))
     path = [start]
     current = start
@@ -131,7 +138,7 @@ def build_forklift_random_walk(
             nxt = (nr, nc)
             if not (0 <= nr < height and 0 <= nc < width):
                 continue
-            if grid[nr][nc] == 1 or nxt in restricted:
+            if cells[nr * width + nc] == 1 or nxt in restricted:
                 continue
             candidates.append(nxt)
         if prev is not None and len(candidates) > 1:
@@ -148,7 +155,7 @@ def build_forklift_random_walk(
 
 
 def ensure_forklift_loop(
-    grid: List[List[int]],
+    grid: Grid,
     path: List[Tuple[int, int]],
 ) -> Tuple[List[Tuple[int, int]], bool]:
     if len(path) < 2:
@@ -163,18 +170,16 @@ def ensure_forklift_loop(
 
 
 def generate_moving_obstacles(
-    grid: List[List[int]],
+    grid: Grid,
     count: int,
     rng: random.Random,
     robots: Sequence[Tuple[int, int]],
     tasks: Sequence[Tuple[int, int]],
 ) -> List[dict]:
-    height = len(grid)
-    width = len(grid[0]) if height else 0
     base_blocked: Set[Tuple[int, int]] = set(robots)
     base_blocked.update(tasks)
     for cell in list(base_blocked):
-        for nb in neighbors4(cell, height, width):
+        for nb in neighbors4(cell, grid.height, grid.width):
             base_blocked.add(nb)
     free_cells = [cell for cell in get_free_cells(grid) if cell not in base_blocked]
     rng.shuffle(free_cells)
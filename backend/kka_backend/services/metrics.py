@@ -0,0 +1,148 @@
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from kka_backend.config import METRICS_ENABLED
+
+LabelKey = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+TIMER_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# name -> (Prometheus type, help)
+METRICS: Dict[str, Tuple[str, str]] = {
+    "kka_request_seconds": ("histogram", "API request handling time by endpoint and status."),
+    "kka_stage_seconds": ("histogram", "Time spent in a pipeline stage."),
+    "kka_path_lookups_total": ("counter", "Point-to-point path lookups, by whether the path was already known."),
+    "kka_path_search_nodes_total": ("counter", "Cells expanded by path searches and distance-field floods."),
+    "kka_path_fields_total": ("counter", "Distance fields flooded from a source cell."),
+    "kka_path_cache_requests_total": ("counter", "Path library cache lookups, by result."),
+    "kka_path_cache_evictions_total": ("counter", "Path libraries evicted from the cache."),
+    "kka_path_cache_entries": ("gauge", "Path libraries held in the cache."),
+    "kka_path_cache_bytes": ("gauge", "Estimated bytes held by cached path libraries."),
+    "kka_csp_nodes_total": ("counter", "Offsets tried by the CSP scheduler."),
+    "kka_csp_backtracks_total": ("counter", "Placements undone by the CSP scheduler."),
+    "kka_cbs_nodes_total": ("counter", "Constraint tree nodes expanded by CBS."),
+    "kka_search_cutoffs_total": ("counter", "Searches stopped by their time budget."),
+    "kka_ga_generations_total": ("counter", "Genetic algorithm generations evolved."),
+    "kka_local_search_iterations_total": ("counter", "Local search moves evaluated."),
+    "kka_warehouse_attempts_total": ("counter", "Warehouse layouts generated, including rejected ones."),
+}
+
+
+def _key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    parts = []
+    for name, value in labels:
+        value = value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """Process-local counters and timer histograms, rendered in the Prometheus text format.
+
+    Names must be declared in ``METRICS``. Values live in the process that records them, so work done
+    in pool workers (island GA, batch) is only counted where that worker reports it.
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._timers: Dict[Tuple[str, LabelKey], List[float]] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def inc(self, name: str, value: float = 1.0, **labels: object) -> None:
+        if not self.enabled:
+            return
+        key = (name, _key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, seconds: float, **labels: object) -> None:
+        if not self.enabled:
+            return
+        key = (name, _key(labels))
+        with self._lock:
+            # Per-bucket counts, then sum and count.
+            slots = self._timers.get(key)
+            if slots is None:
+                slots = self._timers[key] = [0.0] * (len(TIMER_BUCKETS) + 2)
+            for pos, bound in enumerate(TIMER_BUCKETS):
+                if seconds <= bound:
+                    slots[pos] += 1
+                    break
+            slots[-2] += seconds
+            slots[-1] += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels: object) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def timed(self, name: str, **labels: object) -> Callable:
+        """Decorator form of ``timer``."""
+
+        def wrap(fn: Callable) -> Callable:
+            @functools.wraps(fn)
+            def run(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return fn(*args, **kwargs)
+
+            return run
+
+        return wrap
+
+    def collector(self, fn: Callable[[], Iterable[Sample]]) -> Callable[[], Iterable[Sample]]:
+        """Register ``fn`` to supply ``(name, labels, value)`` samples read at render time."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        families: Dict[str, List[str]] = {}
+        with self._lock:
+            counters = list(self._counters.items())
+            timers = [(key, list(slots)) for key, slots in self._timers.items()]
+        for (name, labels), value in counters:
+            families.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for fn in self._collectors:
+            for name, labels, value in fn():
+                line = f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}"
+                families.setdefault(name, []).append(line)
+        for (name, labels), slots in timers:
+            lines = families.setdefault(name, [])
+            cumulative = 0.0
+            for bound, count in zip(TIMER_BUCKETS, slots):
+                cumulative += count
+                bucket = labels + (("le", _format_value(bound)),)
+                lines.append(f"{name}_bucket{_format_labels(bucket)} {_format_value(cumulative)}")
+            bucket = labels + (("le", "+Inf"),)
+            lines.append(f"{name}_bucket{_format_labels(bucket)} {_format_value(slots[-1])}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(slots[-2])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {_format_value(slots[-1])}")
+        out = []
+        for name in sorted(families):
+            kind, help_text = METRICS.get(name, ("untyped", ""))
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(families[name])
+        return "\n".join(out) + "\n"
+
+
+metrics = MetricsRegistry(enabled=bool(METRICS_ENABLED))
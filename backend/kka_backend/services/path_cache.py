@@ -0,0 +1,108 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from kka_backend.config import PATH_CACHE_MAX_BYTES
+from kka_backend.services.metrics import metrics
+from kka_backend.services.paths import PATH_MODES, PathLibrary
+from kka_backend.utils.grid import Grid, diff_walls
+
+CacheKey = Tuple[str, str, str]
+
+
+class PathCache:
+    """Process-wide LRU of path libraries keyed by grid content, algorithm and mode."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[CacheKey, PathLibrary]" = OrderedDict()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.derived = 0
+
+    def get(self, grid: Grid, alg: str, mode: str = "matrix") -> PathLibrary:
+        key = (grid.fingerprint(), alg, mode if mode in PATH_MODES else "matrix")
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                self._evict(keep=key)
+                return cached
+            self.misses += 1
+            library = PathLibrary(grid.copy(), alg, mode)
+            if self.max_bytes <= 0:
+                return library
+            self._entries[key] = library
+            self._evict(keep=key)
+        return library
+
+    def _evict(self, keep: CacheKey) -> None:
+        total = sum(library.nbytes() for library in self._entries.values())
+        while total > self.max_bytes:
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+            total -= self._entries.pop(oldest).nbytes()
+            self.evictions += 1
+
+    def apply_wall_diff(self, old: Grid, new: Grid) -> int:
+        if (old.height, old.width) != (new.height, new.width):
+            return 0
+        added, removed = diff_walls(old, new)
+        if not added and not removed:
+            return 0
+        old_key = old.fingerprint()
+        new_key = new.fingerprint()
+        with self._lock:
+            stale = [
+                (key, library)
+                for key, library in self._entries.items()
+                if key[0] == old_key and (new_key, key[1], key[2]) not in self._entries
+            ]
+        derived = [((new_key, key[1], key[2]), library.derive(new.copy(), added, removed)) for key, library in stale]
+        with self._lock:
+            for key, library in derived:
+                self._entries[key] = library
+                self.derived += 1
+            if derived:
+                self._evict(keep=derived[-1][0])
+        return len(derived)
+
+    def trim(self) -> None:
+        with self._lock:
+            if self._entries:
+                self._evict(keep=next(reversed(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(library.nbytes() for library in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "derived": self.derived,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+path_cache = PathCache(PATH_CACHE_MAX_BYTES)
+
+
+@metrics.collector
+def _path_cache_samples():
+    stats = path_cache.stats()
+    yield "kka_path_cache_requests_total", {"result": "hit"}, stats["hits"]
+    yield "kka_path_cache_requests_total", {"result": "miss"}, stats["misses"]
+    yield "kka_path_cache_evictions_total", {}, stats["evictions"]
+    yield "kka_path_cache_entries", {}, stats["entries"]
+    yield "kka_path_cache_bytes", {}, stats["bytes"]
@@ -1,67 +1,79 @@
 import heapq
 import math
+import threading
 import time
-from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
-from kka_backend.utils.geometry import manhattan, neighbors4
+import numpy as np
+
+from kka_backend.services.metrics import metrics
+from kka_backend.utils.geometry import manhattan
+from kka_backend.utils.grid import Grid, repair_field, wavefront
 
 
 def astar(
-    grid: List[List[int]],
+    grid: Grid,
     start: Tuple[int, int],
     goal: Tuple[int, int],
     heuristic=manhattan,
     dynamic_obstacles: Optional[Iterable] = None,
 ):
     t0 = time.perf_counter()
-    openh: List[Tuple[float, int, Tuple[int, int]]] = []
-    heapq.heappush(openh, (heuristic(start, goal), 0, start))
-    came: Dict[Tuple[int, int], Tuple[int, int]] = {}
-    gscore = {start: 0}
-    closed: Set[Tuple[int, int]] = set()
+    if not grid.in_bounds(start) or not grid.in_bounds(goal):
+        return [], 0, time.perf_counter() - t0
+    width = grid.width
+    cells = grid.cells
+    goal_r, goal_c = goal
+    if heuristic is manhattan:
+        def estimate(idx: int) -> int:
+            r, c = divmod(idx, width)
+            return abs(r - goal_r) + abs(c - goal_c)
+    else:
+        def estimate(idx: int) -> float:
+            return heuristic(divmod(idx, width), goal)
+    origin = grid.cell_id(start)
+    target = grid.cell_id(goal)
+    openh: List[Tuple[float, int, int]] = []
+    heapq.heappush(openh, (estimate(origin), 0, origin))
+    came: Dict[int, int] = {}
+    gscore = {origin: 0}
+    closed: Set[int] = set()
     nodes = 0
-    height = len(grid)
-    width = len(grid[0]) if height else 0
-    dyn_lookup: Dict[int, Set[Tuple[int, int]]] = {}
-    static_dyn: Set[Tuple[int, int]] = set()
+    dyn_lookup: Dict[int, Set[int]] = {}
+    static_dyn: Set[int] = set()
     if isinstance(dynamic_obstacles, dict):
         dyn_lookup = {
-            int(k): {tuple(cell) for cell in v}
+            int(k): {grid.cell_id(cell) for cell in v if grid.in_bounds(cell)}
             for k, v in dynamic_obstacles.items()
         }
     elif dynamic_obstacles:
-        static_dyn = {tuple(cell) for cell in dynamic_obstacles}
+        static_dyn = {grid.cell_id(cell) for cell in dynamic_obstacles if grid.in_bounds(cell)}
     while openh:
         f, g, cur = heapq.heappop(openh)
         if cur in closed:
             continue
         nodes += 1
-        if cur == goal:
-            path = [cur]
+        if cur == target:
+            path = [goal]
             while cur in came:
                 cur = came[cur]
-                path.append(cur)
+                path.append(divmod(cur, width))
             path.reverse()
             return path, nodes, time.perf_counter() - t0
         closed.add(cur)
-        for nb in neighbors4(cur, height, width):
-            if grid[nb[0]][nb[1]] == 1:
+        next_step = g + 1
+        blocked = dyn_lookup.get(next_step, ()) if dyn_lookup else ()
+        for nb in grid.neighbors(cur):
+            if cells[nb] == 1:
                 continue
             if static_dyn and nb in static_dyn:
                 continue
-            next_step = g + 1
-            if dyn_lookup:
-                blocked = dyn_lookup.get(next_step, set())
-                if nb in blocked:
-                    continue
-            tentative = g + 1
-            if tentative < gscore.get(nb, math.inf):
-                gscore[nb] = tentative
+            if nb in blocked:
+                continue
+            if next_step < gscore.get(nb, math.inf):
+                gscore[nb] = next_step
                 came[nb] = cur
-                heapq.heappush(
-                    openh,
-                    (tentative + heuristic(nb, goal), tentative, nb),
-                )
+                heapq.heappush(openh, (next_step + estimate(nb), next_step, nb))
     return [], nodes, time.perf_counter() - t0
 
 
@@ -69,15 +81,120 @@ def dijkstra(grid, start, goal):
     return astar(grid, start, goal, heuristic=lambda a, b: 0)
 
 
+def space_time_astar(
+    grid: Grid,
+    start: Tuple[int, int],
+    goals: Sequence[Tuple[int, int]],
+    library: "PathLibrary",
+    horizon: int,
+    start_time: int = 0,
+    vertex_blocked: Optional[Callable[[int, int], bool]] = None,
+    edge_blocked: Optional[Callable[[int, int, int], bool]] = None,
+    penalty: Optional[Callable[[int, int, int], int]] = None,
+    max_nodes: int = 200000,
+) -> Tuple[List[Tuple[int, int]], int]:
+    """Visit ``goals`` in order from ``start``, waiting in place when a cell is blocked at time ``t``.
+
+    States are ``(cell, goals reached, t)``; the heuristic is the exact static distance through the
+    remaining goals taken from ``library`` fields, so the search only widens around reservations.
+    ``vertex_blocked(cell, t)`` and ``edge_blocked(a, b, t)`` use grid cell ids, the move ``a -> b``
+    leaving at ``t``; ``penalty(a, b, t)`` breaks ties between equally long paths by soft conflicts.
+    Returns the timed path and the number of expanded states.
+    """
+    if not grid.in_bounds(start) or not all(grid.in_bounds(goal) for goal in goals):
+        return [], 0
+    targets = [grid.cell_id(goal) for goal in goals]
+    fields = [library.distances(goal) for goal in goals]
+    total = len(targets)
+    remaining = [0] * (total + 1)
+    for label in range(total - 2, -1, -1):
+        leg = fields[label + 1][targets[label]]
+        if leg < 0:
+            return [], 0
+        remaining[label] = remaining[label + 1] + leg
+    cells = grid.cells
+
+    def advance(idx: int, label: int) -> int:
+        while label < total and idx == targets[label]:
+            label += 1
+        return label
+
+    def estimate(idx: int, label: int) -> int:
+        if label == total:
+            return 0
+        d = fields[label][idx]
+        return d + remaining[label] if d >= 0 else -1
+
+    origin = grid.cell_id(start)
+    label0 = advance(origin, 0)
+    h0 = estimate(origin, label0)
+    if h0 < 0:
+        return [], 0
+    deadline = start_time + horizon
+    state0 = (origin, label0, start_time)
+    openh: List[Tuple[int, int, int, int, Tuple[int, int, int]]] = [(start_time + h0, 0, -start_time, 0, state0)]
+    came: Dict[Tuple[int, int, int], Optional[Tuple[int, int, int]]] = {state0: None}
+    soft: Dict[Tuple[int, int, int], int] = {state0: 0}
+    closed: Set[Tuple[int, int, int]] = set()
+    counter = 0
+    nodes = 0
+    while openh and nodes < max_nodes:
+        _, clashes, _, _, state = heapq.heappop(openh)
+        if state in closed:
+            continue
+        closed.add(state)
+        nodes += 1
+        idx, label, t = state
+        if label == total:
+            path = []
+            while state is not None:
+                path.append(grid.coords(state[0]))
+                state = came[state]
+            path.reverse()
+            return path, nodes
+        nt = t + 1
+        for nb in [idx] + grid.neighbors(idx):
+            if nb != idx and cells[nb] == 1:
+                continue
+            if vertex_blocked is not None and vertex_blocked(nb, nt):
+                continue
+            if nb != idx and edge_blocked is not None and edge_blocked(idx, nb, t):
+                continue
+            nl = advance(nb, label)
+            h = estimate(nb, nl)
+            if h < 0 or nt + h > deadline:
+                continue
+            key = (nb, nl, nt)
+            score = clashes + penalty(idx, nb, t) if penalty is not None else 0
+            if key in soft and soft[key] <= score:
+                continue
+            came[key] = state
+            soft[key] = score
+            counter += 1
+            heapq.heappush(openh, (nt + h, score, -nt, counter, key))
+    return [], nodes
+
+
+PATH_MODES = ("matrix", "pairwise")
+PATH_STEP_BYTES = 64
+FIELD_REPAIR_RATIO = 0.25
+
+
 class PathLibrary:
-    def __init__(self, grid: List[List[int]], alg: str):
+    def __init__(self, grid: Grid, alg: str, mode: str = "matrix"):
         self.grid = grid
         self.alg = alg
+        self.mode = mode if mode in PATH_MODES else "matrix"
         self.cache: Dict[Tuple[Tuple[int, int], Tuple[int, int]], dict] = {}
+        self.fields: Dict[Tuple[int, int], dict] = {}
+        self.free: Optional[np.ndarray] = None
+        self._bytes = 0
+        self._lock = threading.Lock()
 
     def _solve(self, start: Tuple[int, int], goal: Tuple[int, int]) -> dict:
         planner = astar if self.alg == "astar" else dijkstra
         path, nodes, elapsed = planner(self.grid, start, goal)
+        metrics.inc("kka_path_search_nodes_total", nodes, alg=self.alg)
         if not path:
             return {
                 "path": [],
@@ -93,36 +210,178 @@ class PathLibrary:
             "time": elapsed,
         }
 
+    def _flood(self, sources: Sequence[Tuple[int, int]]) -> None:
+        if all(source in self.fields for source in sources):
+            return
+        with self._lock:
+            pending = list(dict.fromkeys(source for source in sources if source not in self.fields))
+            if not pending:
+                return
+            if self.free is None:
+                self.free = self.grid.free_mask()
+            t0 = time.perf_counter()
+            dist, parent = wavefront(self.free, pending)
+            spent = time.perf_counter() - t0
+            elapsed = spent / len(pending)
+            reached = np.count_nonzero(dist >= 0, axis=1)
+            metrics.observe("kka_stage_seconds", spent, stage="distance_fields")
+            metrics.inc("kka_path_fields_total", len(pending))
+            metrics.inc("kka_path_search_nodes_total", int(reached.sum()), alg="wavefront")
+            for row, source in enumerate(pending):
+                self.fields[source] = {
+                    "dist": dist[row],
+                    "parent": parent[row],
+                    "nodes": int(reached[row]),
+                    "time": elapsed,
+                    "charged": False,
+                }
+            self._bytes += dist.nbytes + parent.nbytes
+
+    def field(self, source: Tuple[int, int]) -> dict:
+        if source not in self.fields:
+            self._flood([source])
+        return self.fields[source]
+
+    def distances(self, source: Tuple[int, int]) -> List[int]:
+        entry = self.field(source)
+        listed = entry.get("dist_list")
+        if listed is None:
+            listed = entry["dist"].tolist()
+            entry["dist_list"] = listed
+            self._bytes += 8 * len(listed)
+        return listed
+
+    def prepare(self, sources: Iterable[Tuple[int, int]]) -> None:
+        if self.mode != "matrix":
+            return
+        self._flood(list(sources))
+
+    def _index(self, cell: Tuple[int, int]) -> Optional[int]:
+        if self.grid.in_bounds(cell):
+            return self.grid.cell_id(cell)
+        return None
+
+    def _field_cost(self, start: Tuple[int, int], goal: Tuple[int, int]) -> float:
+        idx = self._index(goal)
+        if idx is None:
+            return math.inf
+        d = int(self.field(start)["dist"][idx])
+        return d if d >= 0 else math.inf
+
+    def _trace(self, start: Tuple[int, int], goal: Tuple[int, int]) -> dict:
+        t0 = time.perf_counter()
+        entry = self.field(start)
+        nodes = 0
+        elapsed = 0.0
+        if not entry["charged"]:
+            entry["charged"] = True
+            nodes = entry["nodes"]
+            elapsed = entry["time"]
+        cost = self._field_cost(start, goal)
+        path: List[Tuple[int, int]] = []
+        if cost != math.inf:
+            parent = entry["parent"]
+            idx = self._index(goal)
+            while idx >= 0:
+                path.append(self.grid.coords(idx))
+                idx = int(parent[idx])
+            path.reverse()
+        return {
+            "path": path,
+            "cost": cost,
+            "nodes": nodes,
+            "time": elapsed + time.perf_counter() - t0,
+        }
+
     def ensure(self, start: Tuple[int, int], goal: Tuple[int, int]) -> dict:
         key = (start, goal)
-        if key not in self.cache:
-            self.cache[key] = self._solve(start, goal)
-        return self.cache[key]
+        info = self.cache.get(key)
+        metrics.inc("kka_path_lookups_total", result="miss" if info is None else "hit")
+        if info is None:
+            if self.mode == "matrix":
+                info = self._trace(start, goal)
+            else:
+                info = self._solve(start, goal)
+            self.cache[key] = info
+            self._bytes += PATH_STEP_BYTES * (len(info["path"]) + 1)
+        return info
 
     def cost(self, start: Tuple[int, int], goal: Tuple[int, int]) -> float:
+        if self.mode == "matrix" and (start, goal) not in self.cache:
+            return self._field_cost(start, goal)
         return self.ensure(start, goal)["cost"]
 
+    def cost_matrix(
+        self,
+        sources: Sequence[Tuple[int, int]],
+        targets: Sequence[Tuple[int, int]],
+    ) -> np.ndarray:
+        matrix = np.full((len(sources), len(targets)), math.inf)
+        if self.mode != "matrix":
+            for row, source in enumerate(sources):
+                for col, target in enumerate(targets):
+                    matrix[row, col] = self.cost(source, target)
+            return matrix
+        self._flood(sources)
+        cols = [(col, self._index(target)) for col, target in enumerate(targets)]
+        cols = [(col, idx) for col, idx in cols if idx is not None]
+        if not sources or not cols:
+            return matrix
+        col_pos, cell_idx = (np.asarray(part, dtype=np.int64) for part in zip(*cols))
+        dist = np.stack([self.fields[source]["dist"] for source in sources])[:, cell_idx]
+        matrix[:, col_pos] = np.where(dist >= 0, dist, math.inf)
+        return matrix
+
     def path(self, start: Tuple[int, int], goal: Tuple[int, int]) -> List[Tuple[int, int]]:
         return self.ensure(start, goal)["path"]
 
+    def nbytes(self) -> int:
+        return self._bytes
 
-def build_timeline(path: List[Tuple[int, int]], tasks: List[Tuple[int, int]]) -> List[dict]:
-    timeline = []
-    task_iter = list(tasks)
-    reached = 0
-    for time_step, cell in enumerate(path):
-        marker = None
-        if reached < len(task_iter) and cell == task_iter[reached]:
-            reached += 1
-            marker = {
-                "task": list(cell),
-                "order": reached,
-            }
-        timeline.append(
-            {
-                "time": time_step,
-                "cell": list(cell),
-                "reached_task": marker,
+    def derive(
+        self,
+        grid: Grid,
+        added: Sequence[Tuple[int, int]],
+        removed: Sequence[Tuple[int, int]],
+    ) -> "PathLibrary":
+        library = PathLibrary(grid, self.alg, self.mode)
+        added_ids = [grid.cell_id(cell) for cell in added if grid.in_bounds(cell)]
+        removed_ids = [grid.cell_id(cell) for cell in removed if grid.in_bounds(cell)]
+        limit = max(1, int(grid.size * FIELD_REPAIR_RATIO))
+        for source, entry in list(self.fields.items()):
+            t0 = time.perf_counter()
+            repaired = repair_field(grid, entry["dist"], entry["parent"], added_ids, removed_ids, limit)
+            if repaired is None:
+                continue
+            dist, parent = repaired
+            library.fields[source] = {
+                "dist": dist,
+                "parent": parent,
+                "nodes": int(np.count_nonzero(dist >= 0)),
+                "time": time.perf_counter() - t0,
+                "charged": False,
             }
-        )
-    return timeline
+            library._bytes += dist.nbytes + parent.nbytes
+        walls = set(added)
+        for (start, goal), info in list(self.cache.items()):
+            if any(cell in walls for cell in info["path"]):
+                continue
+            if removed:
+                if start in library.fields:
+                    shorter = library._field_cost(start, goal) != info["cost"]
+                else:
+                    shorter = any(manhattan(start, cell) + manhattan(cell, goal) < info["cost"] for cell in removed)
+                if shorter:
+                    continue
+            library.cache[(start, goal)] = info
+            library._bytes += PATH_STEP_BYTES * (len(info["path"]) + 1)
+        return library
+
+
+def build_step_columns(path: List[Tuple[int, int]], tasks: List[Tuple[int, int]]) -> dict:
+    """Step metadata for one robot: its timed ``cells`` and the time step at which each task, in order, is reached."""
+    reached = []
+    for time_step, cell in enumerate(path):
+        if len(reached) < len(tasks) and cell == tasks[len(reached)]:
+            reached.append(time_step)
+    return {"cells": path, "reached": reached}
@@ -0,0 +1,584 @@
+import random
+import time
+from typing import Dict
+
+from kka_backend.config import (
+    CBS_MAX_NODES,
+    DEFAULT_MOVING_RANGE,
+    DEFAULT_ROBOT_RANGE,
+    DEFAULT_TASK_RANGE,
+    DEFAULT_WALL_RANGE,
+    MAX_HEIGHT,
+    MAX_ROBOTS,
+    MAX_WIDTH,
+)
+from kka_backend.services.assignments import (
+    analyze_reachability,
+    compile_task_assignments,
+    ga_assign,
+    greedy_assign,
+    hungarian_assign,
+    local_search_assign,
+    pq_greedy_assign,
+)
+from kka_backend.services.cbs import cbs_schedule
+from kka_backend.services.islands import island_ga_assign
+from kka_backend.services.map_generation import generate_moving_obstacles, generate_warehouse
+from kka_backend.services.meta import snapshot_meta
+from kka_backend.services.metrics import metrics
+from kka_backend.services.path_cache import path_cache
+from kka_backend.services.paths import build_step_columns
+from kka_backend.services.progress import JobCancelled, mark_failure, mark_success, touch_progress
+from kka_backend.services.scheduling import ObstacleIndex, csp_schedule
+from kka_backend.services.task_costs import Objective
+from kka_backend.utils.cells import normalize_positions, parse_cell
+from kka_backend.utils.deadline import Deadline
+from kka_backend.utils.grid import encode_grid, get_free_cells, grid_encoding, normalize_grid
+from kka_backend.utils.json_stream import StreamObject
+from kka_backend.utils.numeric import clamp_int, estimate_walkable_cells
+from kka_backend.utils.ranges import choose_from_range, parse_range
+from kka_backend.utils.selection import select_unique_cells
+
+
+def run_generate_map(body: dict) -> dict:
+    progress_id = body.get("progress_id")
+    try:
+        seed_input = body.get("seed")
+        seed = int(seed_input) if seed_input is not None else None
+        rng = random.Random(seed)
+        width = clamp_int(body.get("width", 30), 8, MAX_WIDTH)
+        height = clamp_int(body.get("height", 20), 8, MAX_HEIGHT)
+        wall_range = parse_range(
+            body.get("wall_density_range"),
+            DEFAULT_WALL_RANGE,
+            integer=False,
+            low=0.02,
+            high=0.45,
+        )
+        walkable_estimate = estimate_walkable_cells(width, height, wall_range)
+        max_moving_cap = clamp_int(max(10, walkable_estimate // 60), 0, width * height)
+        robot_range = parse_range(
+            body.get("robot_count_range"),
+            DEFAULT_ROBOT_RANGE,
+            integer=True,
+            low=1,
+            high=MAX_ROBOTS,
+        )
+        moving_range = parse_range(
+            body.get("moving_count_range"),
+            DEFAULT_MOVING_RANGE,
+            integer=True,
+            low=0,
+            high=max(10, max_moving_cap),
+        )
+        task_range = parse_range(
+            body.get("task_count_range"),
+            DEFAULT_TASK_RANGE,
+            integer=True,
+            low=3,
+            high=width * height,
+        )
+        touch_progress(progress_id, 10, "Config ready")
+        num_robots_requested = body.get("num_robots")
+        if num_robots_requested is not None:
+            num_robots = clamp_int(int(num_robots_requested), 1, MAX_ROBOTS)
+        else:
+            num_robots = clamp_int(choose_from_range(rng, robot_range, integer=True), 1, MAX_ROBOTS)
+        tasks_target = 3 * num_robots + 3
+        tasks_min, tasks_max = task_range
+        tasks_count = clamp_int(tasks_target, int(tasks_min), int(tasks_max))
+        moving_requested = body.get("moving")
+        if moving_requested is not None:
+            moving_count = max(0, int(moving_requested))
+        else:
+            moving_count = max(0, choose_from_range(rng, moving_range, integer=True))
+
+        grid, actual_density = generate_warehouse(seed, width, height, wall_range)
+        touch_progress(progress_id, 30, "Generated grid")
+        free_cells = get_free_cells(grid)
+        if not free_cells:
+            free_cells = [(0, 0)]
+        robots = select_unique_cells(rng, list(free_cells), num_robots, forbidden=set())
+        touch_progress(progress_id, 55, "Placed robots")
+        remaining_free = [cell for cell in free_cells if cell not in robots]
+        tasks = select_unique_cells(rng, remaining_free, tasks_count, forbidden=set(robots))
+        if not tasks:
+            tasks = select_unique_cells(rng, list(free_cells), tasks_count, forbidden=set(robots))
+        touch_progress(progress_id, 75, "Placed tasks")
+        moving_count = min(moving_count, max_moving_cap)
+        moving = generate_moving_obstacles(grid, moving_count, rng, robots, tasks)
+        touch_progress(progress_id, 90, "Simulated moving obstacles")
+        response = {
+            "grid": encode_grid(grid, grid_encoding(body)),
+            "tasks": tasks,
+            "robots": robots,
+            "moving": moving,
+            "meta": snapshot_meta(
+                width,
+                height,
+                len(robots),
+                len(tasks),
+                len(moving),
+                seed,
+                actual_density,
+            ),
+        }
+        mark_success(progress_id, "Map ready", payload={"meta": response["meta"]})
+        return response
+    except JobCancelled:
+        raise
+    except Exception as exc:
+        mark_failure(progress_id, str(exc))
+        raise
+
+
+def search_sizes(body: dict, **params: str) -> Dict[str, int]:
+    """Keyword arguments for an optimizer from the body keys mapped to by ``params`` (``pop="ga_population"``).
+
+    Sizes the body leaves out keep the optimizer's defaults, which a time budget can only cut short.
+    """
+    sizes = {}
+    for param, key in params.items():
+        value = body.get(key)
+        if value is not None:
+            sizes[param] = max(1, int(value))
+    return sizes
+
+
+def run_plan_tasks(body: dict) -> dict:
+    progress_id = body.get("progress_id")
+    grid = normalize_grid(body.get("grid", []))
+    robots = normalize_positions(body.get("robots", []))
+    tasks = normalize_positions(body.get("tasks", []))
+    optimizer = body.get("optimizer", "greedy").lower()
+    objective = Objective(str(body.get("objective", "sum")).lower(), float(body.get("objective_weight", 0.5)))
+    deadline = Deadline.from_body(body)
+    alg = body.get("path_alg", "astar")
+    path_mode = body.get("path_mode", "matrix")
+    touch_progress(progress_id, 5, "Normalizing inputs")
+    t_planning_start = time.perf_counter()
+    try:
+        planner = path_cache.get(grid, alg, path_mode)
+        touch_progress(progress_id, 10, "Analyzing reachability")
+        with metrics.timer("kka_stage_seconds", stage="analyze_reachability"):
+            active_robots, inactive_robots, assignable_tasks, unreachable_tasks = analyze_reachability(robots, tasks, planner)
+        touch_progress(progress_id, 30, "Assigning tasks")
+        assignment_progress_start = 30.0
+        assignment_progress_end = 65.0
+        assignment_span = max(1.0, assignment_progress_end - assignment_progress_start)
+
+        def assignment_progress(event, payload):
+            if not progress_id:
+                return
+            pct = assignment_progress_start
+            label = "Assigning tasks"
+            robot_val = payload.get("robot")
+            task_val = payload.get("task")
+            robot_display = list(robot_val) if isinstance(robot_val, (tuple, list)) else robot_val
+            task_display = list(task_val) if isinstance(task_val, (tuple, list)) else task_val
+            if event == "greedy_assign":
+                total = max(1.0, float(payload.get("total", 1)))
+                completed = max(0.0, min(total, float(payload.get("completed", 0))))
+                ratio = completed / total
+                pct = assignment_progress_start + assignment_span * ratio
+                label = f"Greedy assigned ({int(completed)}/{int(total)}) {task_display} → {robot_display}"
+            elif event == "assignment_round":
+                total = max(1.0, float(payload.get("total", 1)))
+                completed = max(0.0, min(total, float(payload.get("completed", 0))))
+                pct = assignment_progress_start + assignment_span * (completed / total)
+                label = f"Assignment round {payload.get('round')} ({int(completed)}/{int(total)} tasks)"
+            elif event == "ga_generation":
+                gens = max(1.0, float(payload.get("total_generations", 1)))
+                generation = max(0.0, min(gens, float(payload.get("generation", 0))))
+                phase = payload.get("phase") or "end"
+                if phase == "start":
+                    ratio = max(0.0, (generation - 1) / gens)
+                else:
+                    ratio = generation / gens
+                pct = assignment_progress_start + assignment_span * ratio
+                best_cost = payload.get("best_cost")
+                if isinstance(best_cost, (int, float)):
+                    cost_display = f"{best_cost:.1f}"
+                else:
+                    cost_display = best_cost
+                if phase == "start":
+                    label = f"GA generation {int(generation)}/{int(gens)} running"
+                else:
+                    label = f"GA generation {int(generation)}/{int(gens)} (best cost {cost_display})"
+            elif event == "ga_generation_step":
+                gens = max(1.0, float(payload.get("total_generations", 1)))
+                generation = max(0.0, min(gens, float(payload.get("generation", 0))))
+                population = max(1.0, float(payload.get("population", 1)))
+                produced = max(0.0, min(population, float(payload.get("produced", 0))))
+                inner_ratio = produced / population
+                overall = max(0.0, (generation - 1 + inner_ratio) / gens)
+                pct = assignment_progress_start + assignment_span * overall
+                label = f"GA generation {int(generation)}/{int(gens)} building population ({int(produced)}/{int(population)})"
+            elif event == "local_search_iteration":
+                total_iters = max(1.0, float(payload.get("total_iterations", 1)))
+                iteration = max(0.0, min(total_iters, float(payload.get("iteration", 0))))
+                ratio = iteration / total_iters
+                pct = assignment_progress_start + assignment_span * ratio
+                best_score = payload.get("best_score")
+                if isinstance(best_score, (int, float)):
+                    best_display = f"{best_score:.1f}"
+                else:
+                    best_display = best_score
+                label = f"Local search loop {int(iteration)}/{int(total_iters)} (best {best_display})"
+            pct = max(assignment_progress_start, min(assignment_progress_end, pct))
+            touch_progress(progress_id, pct, label)
+
+        assignment_cb = assignment_progress if progress_id else None
+        assigned_subset = {r: [] for r in active_robots}
+        if active_robots and assignable_tasks:
+            used = optimizer if optimizer in ("greedy", "greedy_pq", "hungarian", "ga", "ga_islands") else "local"
+            with metrics.timer("kka_stage_seconds", stage="optimizer", optimizer=used):
+                if optimizer == "greedy":
+                    assigned_subset = greedy_assign(grid, active_robots, assignable_tasks, alg, planner, progress_cb=assignment_cb)
+                elif optimizer == "greedy_pq":
+                    assigned_subset = pq_greedy_assign(grid, active_robots, assignable_tasks, alg, planner, progress_cb=assignment_cb)
+                elif optimizer == "hungarian":
+                    assigned_subset = hungarian_assign(grid, active_robots, assignable_tasks, alg, planner, progress_cb=assignment_cb)
+                elif optimizer == "ga":
+                    assigned_subset = ga_assign(
+                        grid,
+                        active_robots,
+                        assignable_tasks,
+                        alg,
+                        planner,
+                        progress_cb=assignment_cb,
+                        objective=objective,
+                        deadline=deadline,
+                        **search_sizes(body, pop="ga_population", gens="ga_generations"),
+                    )
+                elif optimizer == "ga_islands":
+                    assigned_subset = island_ga_assign(
+                        grid,
+                        active_robots,
+                        assignable_tasks,
+                        alg,
+                        planner,
+                        progress_cb=assignment_cb,
+                        objective=objective,
+                        deadline=deadline,
+                        **search_sizes(body, pop="ga_population", gens="ga_generations"),
+                    )
+                else:
+                    assigned_subset = local_search_assign(
+                        grid,
+                        active_robots,
+                        assignable_tasks,
+                        alg,
+                        planner,
+                        progress_cb=assignment_cb,
+                        objective=objective,
+                        deadline=deadline,
+                        **search_sizes(body, iters="local_iterations"),
+                    )
+        assigned = {r: [] for r in robots}
+        for robot, seq in assigned_subset.items():
+            assigned[robot] = seq
+        planning_time_ms = (time.perf_counter() - t_planning_start) * 1000.0
+        touch_progress(progress_id, 65, "Validating assignments")
+        with metrics.timer("kka_stage_seconds", stage="compile_task_assignments"):
+            robot_payload, task_map = compile_task_assignments(robots, assigned, planner)
+        path_cache.trim()
+        compile_progress_start = 65.0
+        compile_progress_end = 85.0
+        compile_span = max(1.0, compile_progress_end - compile_progress_start)
+        total_compile = max(1, len(robots))
+        legacy_costs = {}
+        for idx_robot, (robot, entries) in enumerate(assigned.items(), start=1):
+            cur = robot
+            legs = []
+            total = 0.0
+            for t in entries:
+                info = planner.ensure(cur, t)
+                legs.append(
+                    {
+                        "to": t,
+                        "cost": info["cost"],
+                        "path": info["path"],
+                    }
+                )
+                total += info["cost"]
+                cur = t
+            legacy_costs[str(list(robot))] = {
+                "tasks": entries,
+                "legs": legs,
+                "total_cost": total,
+            }
+            compile_ratio = idx_robot / total_compile
+            compile_pct = compile_progress_start + compile_span * compile_ratio
+            touch_progress(
+                progress_id,
+                compile_pct,
+                f"Verified robot {idx_robot}/{total_compile} assignments",
+            )
+        response = {
+            "assigned": {str(list(k)): v for k, v in assigned.items()},
+            "robots": robot_payload,
+            "task_assignments": task_map,
+            "costs": legacy_costs,
+            "metrics": {
+                "planning_time_ms": planning_time_ms,
+                "objective": objective.mode,
+                "objective_weight": objective.weight,
+                "sum_cost": sum(entry["total_cost"] for entry in robot_payload),
+                "makespan_cost": max((entry["total_cost"] for entry in robot_payload), default=0.0),
+                **deadline.report(),
+                "robots_considered": len(robots),
+                "tasks_considered": len(tasks),
+                "active_robots": len(active_robots),
+                "inactive_robots": len(inactive_robots),
+                "assignable_tasks": len(assignable_tasks),
+                "unreachable_tasks": len(unreachable_tasks),
+                "path_cache": path_cache.stats(),
+            },
+        }
+        touch_progress(progress_id, 90, "Finalizing plan payload")
+        mark_success(progress_id, "Plan ready", payload={"metrics": response["metrics"]})
+        return response
+    except JobCancelled:
+        raise
+    except Exception as exc:
+        mark_failure(progress_id, str(exc))
+        raise
+
+
+def run_compute_paths(body: dict, stream: bool = False) -> dict:
+    """Plan, schedule and time every robot's path.
+
+    With ``stream`` the per-robot sections (``paths``, ``scheduled_paths``, ``stats`` and
+    ``step_metadata``) are ``StreamObject`` generators for ``iter_json`` to encode one robot at a time.
+    """
+    progress_id = body.get("progress_id")
+    grid = normalize_grid(body.get("grid", []))
+    alg = body.get("alg", "astar")
+    path_mode = body.get("path_mode", "matrix")
+    scheduler = body.get("scheduler", "csp")
+    deadline = Deadline.from_body(body)
+    rp_in = body.get("robot_plans", {})
+    robot_plans = {parse_cell(k): [parse_cell(t) for t in v] for k, v in rp_in.items()}
+    touch_progress(progress_id, 5, "Normalizing inputs")
+    try:
+        planner = path_cache.get(grid, alg, path_mode)
+        t_paths_start = time.perf_counter()
+        base_paths = {}
+        perrobot_stats = {}
+        robot_items = list(robot_plans.items())
+        total_robot_plans = max(1, len(robot_items))
+        path_progress_start = 10.0
+        path_progress_end = 50.0
+        path_span = max(1.0, path_progress_end - path_progress_start)
+        for idx_robot, (robot, seq) in enumerate(robot_items, start=1):
+            cur = robot
+            full = [cur]
+            nodes = 0
+            elapsed = 0.0
+            for goal in seq:
+                info = planner.ensure(cur, goal)
+                path = info["path"]
+                if not path:
+                    mark_failure(progress_id, "Path blocked", payload={"robot": robot, "target": goal})
+                    return {"ok": False, "reason": "no_path", "robot": robot, "to": goal}
+                if full and path:
+                    if full[-1] == path[0]:
+                        full.extend(path[1:])
+                    else:
+                        full.extend(path)
+                else:
+                    full.extend(path)
+                nodes += info["nodes"]
+                elapsed += info["time"]
+                cur = goal
+            base_paths[robot] = full
+            robot_key = str(list(robot))
+            perrobot_stats[robot_key] = {
+                "planner_nodes": nodes,
+                "planner_time_s": elapsed,
+                "path_steps": max(len(full) - 1, 0),
+            }
+            ratio = idx_robot / total_robot_plans
+            pct = path_progress_start + path_span * ratio
+            steps = perrobot_stats[robot_key]["path_steps"]
+            detail_bits = [f"{steps} steps"]
+            if nodes:
+                detail_bits.append(f"{nodes} nodes")
+            touch_progress(
+                progress_id,
+                pct,
+                f"Base path {idx_robot}/{total_robot_plans} ({', '.join(detail_bits)})",
+            )
+        path_compute_time_ms = (time.perf_counter() - t_paths_start) * 1000.0
+        metrics.observe("kka_stage_seconds", path_compute_time_ms / 1000.0, stage="base_paths")
+        path_cache.trim()
+        moving = body.get("moving", [])
+        total_moving = max(1, len(moving))
+        moving_progress_start = 50.0
+        moving_progress_end = 65.0
+        moving_span = max(1.0, moving_progress_end - moving_progress_start)
+        if moving:
+            touch_progress(progress_id, moving_progress_start, "Integrating moving obstacles")
+        moving_obs = []
+        for idx_ob, ob in enumerate(moving, start=1):
+            if not isinstance(ob, dict):
+                continue
+            try:
+                norm_path = [parse_cell(pos) for pos in ob.get("path", [])]
+            except Exception:
+                norm_path = []
+            moving_obs.append(
+                {
+                    "path": norm_path,
+                    "loop": bool(ob.get("loop", True)),
+                }
+            )
+            ratio = idx_ob / total_moving
+            pct = moving_progress_start + moving_span * ratio
+            touch_progress(progress_id, pct, f"Integrated obstacle {idx_ob}/{total_moving}")
+        if moving_obs:
+            touch_progress(progress_id, moving_progress_end, f"Moving obstacles integrated ({len(moving_obs)})")
+        else:
+            touch_progress(progress_id, moving_progress_end, "No moving obstacles to integrate")
+        csp_max_offset = 40
+        csp_progress_start = 65.0
+        csp_progress_end = 85.0
+        csp_progress_span = max(1.0, csp_progress_end - csp_progress_start)
+        max_node_hint = max(200.0, total_robot_plans * csp_max_offset * 5.0)
+
+        def csp_progress(stage, payload):
+            if not progress_id:
+                return
+            assigned = float(payload.get("assigned", 0.0))
+            nodes_used = float(payload.get("nodes_expanded", 0.0))
+            ratio_assigned = assigned / total_robot_plans if total_robot_plans else 0.0
+            ratio_nodes = min(1.0, nodes_used / max_node_hint)
+            blended = max(ratio_assigned, ratio_nodes * 0.6)
+            pct = csp_progress_start + csp_progress_span * min(1.0, blended)
+            robot_val = payload.get("robot")
+            if isinstance(robot_val, tuple):
+                robot_display = list(robot_val)
+            elif isinstance(robot_val, list):
+                robot_display = robot_val
+            else:
+                robot_display = robot_val
+            offset_val = payload.get("offset")
+            if stage == "start":
+                label = f"CSP init ({int(payload.get('robots', total_robot_plans))} robots, horizon {payload.get('horizon', 'n/a')})"
+            elif stage == "search_tick":
+                label = f"CSP exploring (placed {int(assigned)}/{total_robot_plans}, nodes {int(nodes_used)})"
+            elif stage == "robot_assigned":
+                label = f"CSP placed {robot_display} at t+{int(offset_val or 0)} ({int(assigned)}/{total_robot_plans})"
+            elif stage == "robot_backtrack":
+                label = f"CSP backtracking {robot_display} (nodes {int(nodes_used)})"
+            elif stage == "done":
+                if payload.get("ok"):
+                    label = "CSP offsets solved"
+                elif payload.get("cut_off"):
+                    label = "CSP stopped at time budget"
+                else:
+                    label = "CSP search exhausted"
+            else:
+                label = "CSP scheduling"
+            touch_progress(progress_id, pct, label)
+
+        def cbs_progress(stage, payload):
+            if not progress_id:
+                return
+            nodes_used = float(payload.get("nodes_expanded", 0.0))
+            ratio_nodes = min(1.0, nodes_used / max(1.0, float(payload.get("max_nodes", CBS_MAX_NODES))))
+            pct = csp_progress_start + csp_progress_span * ratio_nodes
+            if stage == "start":
+                label = f"CBS init ({int(payload.get('robots', total_robot_plans))} robots, horizon {payload.get('horizon', 'n/a')})"
+            elif stage == "search_tick":
+                label = f"CBS splitting conflicts (nodes {int(nodes_used)}, best {int(payload.get('conflicts', 0))} conflicts)"
+            elif stage == "done":
+                pct = csp_progress_end
+                label = "CBS paths solved" if payload.get("ok") else f"CBS stopped with {int(payload.get('conflicts', 0))} conflicts"
+            else:
+                label = "CBS scheduling"
+            touch_progress(progress_id, pct, label)
+
+        t_schedule_start = time.perf_counter()
+        obstacles = ObstacleIndex(moving_obs, grid)
+        csp = None
+        cbs = None
+        timed_paths = {}
+        if scheduler == "cbs":
+            cbs_cb = cbs_progress if progress_id else None
+            cbs = cbs_schedule(
+                grid,
+                robot_plans,
+                obstacles,
+                planner,
+                max_offset=csp_max_offset,
+                max_nodes=CBS_MAX_NODES,
+                progress_cb=cbs_cb,
+                deadline=deadline,
+            )
+            timed_paths = cbs.pop("paths")
+        else:
+            csp_cb = csp_progress if progress_id else None
+            csp = csp_schedule(base_paths, obstacles, max_offset=csp_max_offset, progress_cb=csp_cb, deadline=deadline)
+        schedule_time_ms = (time.perf_counter() - t_schedule_start) * 1000.0
+        schedule_label = "CBS path" if cbs is not None else "CSP offset"
+        scheduled_paths = {}
+        base_items = list(base_paths.items())
+        total_schedules = max(1, len(base_items))
+        schedule_progress_start = 85.0
+        schedule_progress_end = 95.0
+        schedule_span = max(1.0, schedule_progress_end - schedule_progress_start)
+        for idx_robot, (robot, path) in enumerate(base_items, start=1):
+            if robot in timed_paths:
+                full = timed_paths[robot]
+                wait_steps = max(len(full) - len(path), 0)
+            else:
+                delay = csp.get("start_times", {}).get(robot, 0) if csp else 0
+                wait_segment = [path[0]] * int(delay) if path else []
+                full = wait_segment + path
+                wait_steps = max(int(delay), 0)
+            robot_key = str(list(robot))
+            scheduled_paths[robot] = full
+            entry = perrobot_stats.setdefault(robot_key, {})
+            entry.setdefault("path_steps", max(len(path) - 1, 0))
+            execution_steps = max(len(full) - 1, 0)
+            entry["wait_steps"] = wait_steps
+            entry["execution_steps"] = execution_steps
+            entry["execution_time_s"] = execution_steps
+            ratio = idx_robot / total_schedules
+            pct = schedule_progress_start + schedule_span * ratio
+            touch_progress(progress_id, pct, f"Applied {schedule_label} {idx_robot}/{total_schedules}")
+        if csp and isinstance(csp.get("start_times"), dict):
+            csp["start_times"] = {str(list(k)): v for k, v in csp["start_times"].items()}
+        sections = {
+            "paths": ((str(list(robot)), path) for robot, path in base_paths.items()),
+            "scheduled_paths": ((str(list(robot)), path) for robot, path in scheduled_paths.items()),
+            "stats": iter(perrobot_stats.items()),
+            "step_metadata": (
+                (str(list(robot)), build_step_columns(path, robot_plans.get(robot, [])))
+                for robot, path in scheduled_paths.items()
+            ),
+        }
+        response = {
+            "ok": True,
+            **{name: StreamObject(pairs) if stream else dict(pairs) for name, pairs in sections.items()},
+            "scheduler": "cbs" if cbs is not None else "csp",
+            "csp": csp,
+            "cbs": cbs,
+            "timing": {
+                "path_compute_time_ms": path_compute_time_ms,
+                "schedule_time_ms": schedule_time_ms,
+                "total_execution_time_ms": path_compute_time_ms + schedule_time_ms,
+            },
+            "metrics": deadline.report(),
+            "path_cache": path_cache.stats(),
+        }
+        touch_progress(progress_id, 97, "Finalizing schedule payload")
+        mark_success(progress_id, "Paths ready", payload={"timing": response["timing"]})
+        return response
+    except JobCancelled:
+        raise
+    except Exception as exc:
+        mark_failure(progress_id, str(exc))
+        raise
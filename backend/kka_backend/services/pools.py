@@ -0,0 +1,31 @@
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+
+_lock = threading.Lock()
+_pools: Dict[str, ProcessPoolExecutor] = {}
+
+
+def process_pool(name: str, workers: int) -> ProcessPoolExecutor:
+    """Named process pool, started on first use with the spawn method and shut down at exit.
+
+    Spawned workers import the backend fresh instead of inheriting the Flask threads and locks of a
+    forked parent, and keep their module state (such as ``path_cache``) between tasks.
+    """
+    with _lock:
+        pool = _pools.get(name)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=max(1, workers), mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(pool.shutdown, wait=False, cancel_futures=True)
+            _pools[name] = pool
+        return pool
+
+
+def reset_pool(name: str) -> None:
+    """Drop a pool after a worker failure so the next call starts a fresh one."""
+    with _lock:
+        pool = _pools.pop(name, None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
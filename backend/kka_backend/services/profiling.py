@@ -0,0 +1,102 @@
+import cProfile
+import functools
+import marshal
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Any, Callable, Optional
+
+from kka_backend.config import PROFILE_SAMPLE_MS, PROFILING_ENABLED
+from kka_backend.services.progress import progress_registry
+
+# format -> (download mimetype, file extension)
+PROFILE_FORMATS = {
+    "collapsed": ("text/plain; charset=utf-8", "folded"),
+    "pstats": ("application/octet-stream", "prof"),
+}
+DEFAULT_PROFILE_FORMAT = "collapsed"
+
+
+def requested_profile(body: dict, header: Optional[str] = None) -> Optional[str]:
+    """Profile format asked for by the ``profile`` body field or ``X-Profile`` header, if profiling is enabled.
+
+    ``true``/``1`` pick the default format; unknown names fall back to it as well.
+    """
+    if not PROFILING_ENABLED:
+        return None
+    value = body.get("profile", header)
+    if value is None or value is False or str(value).strip().lower() in ("", "0", "false", "no", "off"):
+        return None
+    value = str(value).strip().lower()
+    return value if value in PROFILE_FORMATS else DEFAULT_PROFILE_FORMAT
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    """Samples one thread's Python stack every ``interval`` seconds into flamegraph collapsed stacks.
+
+    Frames at and above ``root`` are left out, so stacks start at the profiled function instead of
+    the web server. Work done in pool processes (island GA, batch) is not seen.
+    """
+
+    def __init__(self, thread_id: int, root, interval: float) -> None:
+        self.thread_id = thread_id
+        self.root = root
+        self.interval = max(0.001, interval)
+        self.counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="kka-profile", daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.root:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def __enter__(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> bytes:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.counts.items())).encode("utf-8")
+
+
+def profiled(fn: Callable[[dict], Any], fmt: str) -> Callable[[dict], Any]:
+    """Wrap a pipeline function so each call is profiled and the profile stored on its progress entry.
+
+    ``collapsed`` samples the stack (cheap enough for large inputs); ``pstats`` runs under cProfile
+    and stores the marshalled stats that ``pstats.Stats``, snakeviz and friends load. The profile is
+    kept even when the call fails or is cancelled, since those are the runs worth looking at.
+    """
+
+    @functools.wraps(fn)
+    def run(body: dict) -> Any:
+        job_id = body.get("progress_id")
+        if fmt == "pstats":
+            profiler = cProfile.Profile()
+            try:
+                return profiler.runcall(fn, body)
+            finally:
+                profiler.create_stats()
+                progress_registry.set_profile(job_id, fmt, marshal.dumps(profiler.stats))
+        sampler = StackSampler(threading.get_ident(), sys._getframe(), PROFILE_SAMPLE_MS / 1000.0)
+        try:
+            with sampler:
+                return fn(body)
+        finally:
+            progress_registry.set_profile(job_id, fmt, sampler.collapsed())
+
+    return run
@@ -1,17 +1,65 @@
+import os
+import sqlite3
 import threading
 import time
 import uuid
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from kka_backend.config import PROGRESS_DB_PATH, PROGRESS_STORE, PROGRESS_TTL_SECONDS
+from kka_backend.utils.json_codec import dumps, loads
+
+
+class JobCancelled(Exception):
+    """Raised from progress updates once a job has been asked to stop."""
+
+
+Mutation = Callable[[Dict[str, Any]], Any]
+
+
+def _store_result(entry: Dict[str, Any]) -> None:
+    entry.update(result_ready=True, result_pending=False, status="success", percent=100)
 
 
 class ProgressRegistry:
     """In-memory tracker for long running operations."""
 
-    def __init__(self) -> None:
+    prune_interval = 60.0
+
+    def __init__(self, ttl_seconds: float = PROGRESS_TTL_SECONDS) -> None:
+        self.ttl_seconds = ttl_seconds
         self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
         self._store: Dict[str, Dict[str, Any]] = {}
+        self._results: Dict[str, Any] = {}
+        self._profiles: Dict[str, Tuple[str, bytes]] = {}
+        self._last_prune = time.monotonic()
+
+    def _touch(self, entry: Dict[str, Any]) -> None:
+        entry["updated_at"] = time.time()
+        entry["version"] += 1
+
+    def _insert(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._store[entry["id"]] = entry
+
+    def _mutate(self, job_id: str, fn: Mutation) -> Any:
+        with self._lock:
+            entry = self._store.get(job_id)
+            if not entry:
+                return None
+            out = fn(entry)
+            self._touch(entry)
+            self._changed.notify_all()
+            return out
+
+    def _prune_due(self) -> None:
+        now = time.monotonic()
+        if self.ttl_seconds > 0 and now - self._last_prune >= self.prune_interval:
+            self._last_prune = now
+            self.prune(self.ttl_seconds)
 
     def create(self, action: str, label: Optional[str] = None) -> Dict[str, Any]:
+        self._prune_due()
         job_id = uuid.uuid4().hex
         entry = {
             "id": job_id,
@@ -22,11 +70,15 @@ class ProgressRegistry:
             "status": "running",
             "error": None,
             "payload": None,
+            "cancel_requested": False,
+            "result_ready": False,
+            "result_pending": False,
+            "profile": None,
+            "version": 0,
             "created_at": time.time(),
             "updated_at": time.time(),
         }
-        with self._lock:
-            self._store[job_id] = entry
+        self._insert(entry)
         return entry.copy()
 
     def update(
@@ -38,13 +90,12 @@ class ProgressRegistry:
         status: Optional[str] = None,
         payload: Optional[Any] = None,
         error: Optional[str] = None,
-    ) -> None:
+    ) -> bool:
+        """Apply the given fields; returns whether the job has been asked to cancel."""
         if not job_id:
-            return
-        with self._lock:
-            entry = self._store.get(job_id)
-            if not entry:
-                return
+            return False
+
+        def apply(entry: Dict[str, Any]) -> bool:
             if message is not None:
                 entry["message"] = message
             if percent is not None:
@@ -55,34 +106,71 @@ class ProgressRegistry:
                 entry["payload"] = payload
             if error is not None:
                 entry["error"] = error
-            entry["updated_at"] = time.time()
+            return entry["cancel_requested"]
+
+        return bool(self._mutate(job_id, apply))
 
     def complete(self, job_id: Optional[str], payload: Optional[Any] = None, message: Optional[str] = None) -> None:
         if not job_id:
             return
-        with self._lock:
-            entry = self._store.get(job_id)
-            if not entry:
-                return
+
+        def apply(entry: Dict[str, Any]) -> None:
             entry["percent"] = 100
-            entry["status"] = "success"
+            # Jobs stay running until ``set_result`` stores what ``/api/jobs/<id>/result`` returns.
+            if not entry.get("result_pending"):
+                entry["status"] = "success"
             if message is not None:
                 entry["message"] = message
             if payload is not None:
                 entry["payload"] = payload
-            entry["updated_at"] = time.time()
+
+        self._mutate(job_id, apply)
 
     def fail(self, job_id: Optional[str], error: str) -> None:
         if not job_id:
             return
-        with self._lock:
-            entry = self._store.get(job_id)
-            if not entry:
-                return
+
+        def apply(entry: Dict[str, Any]) -> None:
             entry["status"] = "error"
             entry["error"] = error
             entry["percent"] = min(entry.get("percent", 0), 99)
-            entry["updated_at"] = time.time()
+
+        self._mutate(job_id, apply)
+
+    def request_cancel(self, job_id: str) -> None:
+        self._mutate(job_id, lambda entry: entry.update(cancel_requested=True))
+
+    def cancel_requested(self, job_id: Optional[str]) -> bool:
+        if not job_id:
+            return False
+        entry = self.get(job_id)
+        return bool(entry and entry["cancel_requested"])
+
+    def queued(self, job_id: str) -> None:
+        self._mutate(job_id, lambda entry: entry.update(status="queued", message="Queued", result_pending=True))
+
+    def cancelled(self, job_id: str) -> None:
+        self._mutate(job_id, lambda entry: entry.update(status="cancelled", message="Cancelled", error=None))
+
+    def set_result(self, job_id: str, result: Any) -> None:
+        with self._lock:
+            if job_id in self._store:
+                self._results[job_id] = result
+        self._mutate(job_id, _store_result)
+
+    def get_result(self, job_id: str) -> Optional[Any]:
+        with self._lock:
+            return self._results.get(job_id)
+
+    def set_profile(self, job_id: str, fmt: str, data: bytes) -> None:
+        with self._lock:
+            if job_id in self._store:
+                self._profiles[job_id] = (fmt, data)
+        self._mutate(job_id, lambda entry: entry.update(profile=fmt))
+
+    def get_profile(self, job_id: str) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            return self._profiles.get(job_id)
 
     def get(self, job_id: str) -> Optional[Dict[str, Any]]:
         with self._lock:
@@ -91,19 +179,153 @@ class ProgressRegistry:
                 return None
             return entry.copy()
 
+    def wait(self, job_id: str, version: int, timeout: float) -> Optional[Dict[str, Any]]:
+        """Block until the entry moves past ``version`` or ``timeout`` elapses, then return a copy."""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                entry = self._store.get(job_id)
+                if not entry:
+                    return None
+                remaining = deadline - time.monotonic()
+                if entry["version"] > version or remaining <= 0:
+                    return entry.copy()
+                self._changed.wait(remaining)
+
     def prune(self, ttl_seconds: float = 3600) -> None:
         cutoff = time.time() - ttl_seconds
         with self._lock:
             expired = [job_id for job_id, entry in self._store.items() if entry.get("updated_at", 0) < cutoff]
             for job_id in expired:
                 self._store.pop(job_id, None)
+                self._results.pop(job_id, None)
+                self._profiles.pop(job_id, None)
+            if expired:
+                self._changed.notify_all()
+
+
+class SqliteProgressRegistry(ProgressRegistry):
+    """Progress entries and job results kept in a SQLite file shared by every worker process.
+
+    Each thread holds its own connection (reopened after a fork). ``wait`` polls the row version,
+    since other processes cannot signal this one's condition variable.
+    """
+
+    poll_interval = 0.05
+
+    def __init__(self, path: str, ttl_seconds: float = PROGRESS_TTL_SECONDS) -> None:
+        super().__init__(ttl_seconds)
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS progress (id TEXT PRIMARY KEY, entry TEXT NOT NULL, updated_at REAL NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS results (id TEXT PRIMARY KEY, result TEXT NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS profiles (id TEXT PRIMARY KEY, format TEXT NOT NULL, data BLOB NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS progress_updated ON progress (updated_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _insert(self, entry: Dict[str, Any]) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO progress (id, entry, updated_at) VALUES (?, ?, ?)",
+            (entry["id"], dumps(entry, default=str), entry["updated_at"]),
+        )
+
+    def _mutate(self, job_id: str, fn: Mutation) -> Any:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT entry FROM progress WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            entry = loads(row[0])
+            out = fn(entry)
+            self._touch(entry)
+            conn.execute(
+                "UPDATE progress SET entry = ?, updated_at = ? WHERE id = ?",
+                (dumps(entry, default=str), entry["updated_at"], job_id),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return out
+
+    def set_result(self, job_id: str, result: Any) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO results (id, result) VALUES (?, ?)",
+            (job_id, dumps(result, default=str)),
+        )
+        self._mutate(job_id, _store_result)
+
+    def get_result(self, job_id: str) -> Optional[Any]:
+        row = self._conn().execute("SELECT result FROM results WHERE id = ?", (job_id,)).fetchone()
+        return loads(row[0]) if row else None
+
+    def set_profile(self, job_id: str, fmt: str, data: bytes) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO profiles (id, format, data) VALUES (?, ?, ?)",
+            (job_id, fmt, sqlite3.Binary(data)),
+        )
+        self._mutate(job_id, lambda entry: entry.update(profile=fmt))
+
+    def get_profile(self, job_id: str) -> Optional[Tuple[str, bytes]]:
+        row = self._conn().execute("SELECT format, data FROM profiles WHERE id = ?", (job_id,)).fetchone()
+        return (row[0], bytes(row[1])) if row else None
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT entry FROM progress WHERE id = ?", (job_id,)).fetchone()
+        return loads(row[0]) if row else None
+
+    def wait(self, job_id: str, version: int, timeout: float) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        while True:
+            entry = self.get(job_id)
+            if entry is None:
+                return None
+            remaining = deadline - time.monotonic()
+            if entry["version"] > version or remaining <= 0:
+                return entry
+            time.sleep(min(self.poll_interval, remaining))
+
+    def prune(self, ttl_seconds: float = 3600) -> None:
+        cutoff = time.time() - ttl_seconds
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM results WHERE id IN (SELECT id FROM progress WHERE updated_at < ?)", (cutoff,))
+            conn.execute("DELETE FROM profiles WHERE id IN (SELECT id FROM progress WHERE updated_at < ?)", (cutoff,))
+            conn.execute("DELETE FROM progress WHERE updated_at < ?", (cutoff,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def build_progress_registry() -> ProgressRegistry:
+    if PROGRESS_STORE == "sqlite":
+        return SqliteProgressRegistry(PROGRESS_DB_PATH)
+    return ProgressRegistry()
 
 
-progress_registry = ProgressRegistry()
+progress_registry = build_progress_registry()
 
 
 def touch_progress(job_id: Optional[str], percent: float, message: str) -> None:
-    progress_registry.update(job_id, percent=percent, message=message)
+    if progress_registry.update(job_id, percent=percent, message=message):
+        raise JobCancelled(job_id)
 
 
 def mark_success(job_id: Optional[str], message: str, payload: Optional[Any] = None) -> None:
@@ -0,0 +1,122 @@
+from typing import Dict, List, Optional
+
+from kka_backend.services.task_costs import TaskCosts
+
+Deltas = Dict[int, float]
+
+
+class Routes:
+    """Explicit per-robot task orders over a ``TaskCosts`` with constant-time move deltas.
+
+    ``routes[r]`` lists task indices in visiting order and ``loads[r]`` is that robot's path cost.
+    Each ``*_delta`` method returns the cost change per affected robot without touching the routes;
+    the matching ``apply_*`` commits it. Leg costs are shortest-path distances on an undirected grid
+    and therefore symmetric, so reversing a slice only changes its two boundary legs.
+    """
+
+    def __init__(self, costs: TaskCosts, routes: List[List[int]]) -> None:
+        self.costs = costs
+        self.start = costs.start.tolist()
+        self.legs = costs.legs.tolist()
+        self.routes = routes
+        self.loads = [self.route_cost(robot) for robot in range(len(routes))]
+
+    def _leg(self, robot: int, prev: Optional[int], task: int) -> float:
+        return self.start[robot][task] if prev is None else self.legs[prev][task]
+
+    def _tail(self, task: int, nxt: Optional[int]) -> float:
+        return 0.0 if nxt is None else self.legs[task][nxt]
+
+    @staticmethod
+    def _at(route: List[int], pos: int) -> Optional[int]:
+        return route[pos] if 0 <= pos < len(route) else None
+
+    def route_cost(self, robot: int) -> float:
+        total = 0.0
+        prev = None
+        for task in self.routes[robot]:
+            total += self._leg(robot, prev, task)
+            prev = task
+        return total
+
+    def total(self) -> float:
+        return sum(self.loads)
+
+    def copy_routes(self) -> List[List[int]]:
+        return [route[:] for route in self.routes]
+
+    def _replace(self, robot: int, pos: int, task: int) -> float:
+        route = self.routes[robot]
+        prev = self._at(route, pos - 1)
+        nxt = self._at(route, pos + 1)
+        old = route[pos]
+        return self._leg(robot, prev, task) + self._tail(task, nxt) - self._leg(robot, prev, old) - self._tail(old, nxt)
+
+    def swap_delta(self, a: int, i: int, b: int, j: int) -> Deltas:
+        """Exchange ``routes[a][i]`` with ``routes[b][j]``."""
+        if a != b:
+            return {a: self._replace(a, i, self.routes[b][j]), b: self._replace(b, j, self.routes[a][i])}
+        if i > j:
+            i, j = j, i
+        route = self.routes[a]
+        if j != i + 1:
+            return {a: self._replace(a, i, route[j]) + self._replace(a, j, route[i])}
+        prev = self._at(route, i - 1)
+        nxt = self._at(route, j + 1)
+        x, y = route[i], route[j]
+        old = self._leg(a, prev, x) + self.legs[x][y] + self._tail(y, nxt)
+        new = self._leg(a, prev, y) + self.legs[y][x] + self._tail(x, nxt)
+        return {a: new - old}
+
+    def apply_swap(self, a: int, i: int, b: int, j: int, deltas: Deltas) -> None:
+        self.routes[a][i], self.routes[b][j] = self.routes[b][j], self.routes[a][i]
+        self._commit(deltas)
+
+    def reverse_delta(self, a: int, i: int, j: int) -> Deltas:
+        """2-opt: reverse ``routes[a][i : j + 1]``."""
+        route = self.routes[a]
+        prev = self._at(route, i - 1)
+        nxt = self._at(route, j + 1)
+        x, y = route[i], route[j]
+        return {a: self._leg(a, prev, y) + self._tail(x, nxt) - self._leg(a, prev, x) - self._tail(y, nxt)}
+
+    def apply_reverse(self, a: int, i: int, j: int, deltas: Deltas) -> None:
+        self.routes[a][i : j + 1] = self.routes[a][i : j + 1][::-1]
+        self._commit(deltas)
+
+    def move_delta(self, a: int, i: int, length: int, b: int, j: int) -> Deltas:
+        """Or-opt / relocate: move ``routes[a][i : i + length]`` in front of position ``j`` of route ``b``.
+
+        ``j`` indexes route ``b`` after the segment has been taken out, so it ranges over
+        ``0 .. len(routes[b])`` (minus ``length`` when ``b == a``).
+        """
+        route = self.routes[a]
+        first, last = route[i], route[i + length - 1]
+        prev = self._at(route, i - 1)
+        nxt = self._at(route, i + length)
+        removed = -self._leg(a, prev, first) - self._tail(last, nxt)
+        if nxt is not None:
+            removed += self._leg(a, prev, nxt)
+        if a == b:
+            before = self._at(route, j - 1 if j - 1 < i else j - 1 + length)
+            after = self._at(route, j if j < i else j + length)
+        else:
+            before = self._at(self.routes[b], j - 1)
+            after = self._at(self.routes[b], j)
+        inserted = self._leg(b, before, first) + self._tail(last, after)
+        if after is not None:
+            inserted -= self._leg(b, before, after)
+        if a == b:
+            return {a: removed + inserted}
+        inner = sum(self.legs[route[k]][route[k + 1]] for k in range(i, i + length - 1))
+        return {a: removed - inner, b: inserted + inner}
+
+    def apply_move(self, a: int, i: int, length: int, b: int, j: int, deltas: Deltas) -> None:
+        segment = self.routes[a][i : i + length]
+        del self.routes[a][i : i + length]
+        self.routes[b][j:j] = segment
+        self._commit(deltas)
+
+    def _commit(self, deltas: Deltas) -> None:
+        for robot, delta in deltas.items():
+            self.loads[robot] += delta
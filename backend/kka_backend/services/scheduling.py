@@ -1,44 +1,190 @@
-from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
 
+import numpy as np
+
+from kka_backend.services.metrics import metrics
 from kka_backend.utils.cells import parse_cell
+from kka_backend.utils.deadline import Deadline
+from kka_backend.utils.grid import Grid
+
 
+ProgressCallback = Callable[[str, dict], None]
 
-def obstacle_timeline_index(length: int, step: int, loop: bool) -> int:
-    if length <= 0:
-        return 0
-    if loop:
-        return step % length
-    return min(step, length - 1)
+Phases = Tuple[int, bool, FrozenSet[int]]
 
 
-ProgressCallback = Callable[[str, dict], None]
+class ObstacleIndex:
+    """Forklift occupancy keyed by grid cell id and answered from phases modulo each obstacle's period.
+
+    A looping obstacle holds ``path[t % period]``; a one-shot obstacle walks its path once and then
+    parks on the last cell. ``occupied`` and ``swap`` cost one check per obstacle touching the cell,
+    independent of how far ahead ``t`` is.
+    """
+
+    def __init__(self, moving: Iterable[dict], grid: Grid) -> None:
+        self.grid = grid
+        self.paths: List[Tuple[List[Tuple[int, int]], bool]] = []
+        self.vertices: Dict[int, List[Phases]] = {}
+        self.moves: Dict[Tuple[int, int], List[Phases]] = {}
+        self.parked: Dict[int, int] = {}
+        for ob in moving:
+            try:
+                path = [parse_cell(cell) for cell in ob.get("path", [])]
+            except (TypeError, ValueError):
+                continue
+            if not path:
+                continue
+            looping = bool(ob.get("loop", True))
+            self.paths.append((path, looping))
+            period = len(path)
+            ids = [grid.cell_id(cell) if grid.in_bounds(cell) else -1 for cell in path]
+            visits: Dict[int, Set[int]] = {}
+            for k, idx in enumerate(ids):
+                visits.setdefault(idx, set()).add(k)
+            for idx, phases in visits.items():
+                if idx >= 0:
+                    self.vertices.setdefault(idx, []).append((period, looping, frozenset(phases)))
+            if not looping:
+                last = ids[-1]
+                if last >= 0:
+                    self.parked[last] = min(self.parked.get(last, period - 1), period - 1)
+            steps: Dict[Tuple[int, int], Set[int]] = {}
+            for k in range(period if looping else period - 1):
+                a = ids[k]
+                b = ids[(k + 1) % period]
+                if a != b and a >= 0 and b >= 0:
+                    steps.setdefault((a, b), set()).add(k)
+            for move, phases in steps.items():
+                self.moves.setdefault(move, []).append((period, looping, frozenset(phases)))
+
+    def __bool__(self) -> bool:
+        return bool(self.paths)
+
+    def occupied(self, idx: int, t: int) -> bool:
+        for period, looping, phases in self.vertices.get(idx, ()):
+            if (t % period if looping else t) in phases:
+                return True
+        parked = self.parked.get(idx)
+        return parked is not None and t >= parked
+
+    def swap(self, a: int, b: int, t: int) -> bool:
+        """Whether a robot moving ``a -> b`` at ``t`` meets an obstacle moving ``b -> a``."""
+        for period, looping, phases in self.moves.get((b, a), ()):
+            if (t % period if looping else t) in phases:
+                return True
+        return False
+
 
+class ReservationTable:
+    """Robot start offsets checked against each other and the forklifts.
 
-def csp_schedule(paths, moving_obstacles, max_offset=20, progress_cb: Optional[ProgressCallback] = None):
+    Forklifts are answered by an ``ObstacleIndex``. Robots register their path once and are then
+    reserved at a start offset, so the offsets that clash with another robot can be found by
+    shifting a precomputed set of time differences instead of rescanning both paths.
+    """
+
+    def __init__(self, obstacles: ObstacleIndex) -> None:
+        self.obstacles = obstacles
+        self.width = obstacles.grid.width
+        self.paths: Dict[Any, np.ndarray] = {}
+        self.offsets: Dict[Any, int] = {}
+        self._static_blocked: Dict[Tuple[Any, int], np.ndarray] = {}
+        self._shifts: Dict[Tuple[Any, Any], np.ndarray] = {}
+
+    def encode(self, path: Sequence[Tuple[int, int]]) -> np.ndarray:
+        return np.asarray([r * self.width + c for r, c in path], dtype=np.int64)
+
+    def register(self, owner: Any, path: Sequence[Tuple[int, int]]) -> None:
+        self.release(owner)
+        self.paths[owner] = self.encode(path)
+        self._shifts = {key: val for key, val in self._shifts.items() if owner not in key}
+        self._static_blocked = {key: val for key, val in self._static_blocked.items() if key[0] != owner}
+
+    def reserve(self, owner: Any, offset: int) -> None:
+        self.release(owner)
+        self.offsets[owner] = offset
+
+    def release(self, owner: Any) -> None:
+        self.offsets.pop(owner, None)
+
+    def _obstacle_blocked(self, owner: Any, max_offset: int) -> np.ndarray:
+        cached = self._static_blocked.get((owner, max_offset))
+        if cached is not None:
+            return cached
+        obstacles = self.obstacles
+        blocked = np.zeros(max_offset + 1, dtype=bool)
+        seq = self.paths[owner].tolist()
+        offsets = np.arange(max_offset + 1, dtype=np.int64)[:, None]
+        visits: Dict[int, List[int]] = {}
+        swaps: Dict[Tuple[int, int], List[int]] = {}
+        for k, idx in enumerate(seq):
+            if idx in obstacles.vertices or idx in obstacles.parked:
+                visits.setdefault(idx, []).append(k)
+            if k + 1 < len(seq) and (seq[k + 1], idx) in obstacles.moves:
+                swaps.setdefault((seq[k + 1], idx), []).append(k)
+        for table, groups in ((obstacles.vertices, visits), (obstacles.moves, swaps)):
+            for key, steps in groups.items():
+                times = offsets + np.asarray(steps, dtype=np.int64)[None, :]
+                for period, looping, phases in table.get(key, ()):
+                    phase = times % period if looping else times
+                    blocked |= np.isin(phase, list(phases)).any(axis=1)
+        for idx, steps in visits.items():
+            parked = obstacles.parked.get(idx)
+            if parked is not None:
+                blocked |= offsets[:, 0] + max(steps) >= parked
+        self._static_blocked[(owner, max_offset)] = blocked
+        return blocked
+
+    def _conflict_shifts(self, owner: Any, other: Any) -> np.ndarray:
+        shifts = self._shifts.get((owner, other))
+        if shifts is None:
+            mine = self.paths[owner]
+            theirs = self.paths[other]
+            k, m = np.nonzero(mine[:, None] == theirs[None, :])
+            swaps_k, swaps_m = np.nonzero(
+                (mine[:-1, None] == theirs[None, 1:]) & (mine[1:, None] == theirs[None, :-1])
+            )
+            shifts = np.unique(np.concatenate((m - k, swaps_m - swaps_k)))
+            self._shifts[(owner, other)] = shifts
+        return shifts
+
+    def blocked_offsets(self, owner: Any, max_offset: int) -> np.ndarray:
+        blocked = self._obstacle_blocked(owner, max_offset).copy()
+        for other, other_offset in self.offsets.items():
+            if other == owner:
+                continue
+            starts = other_offset + self._conflict_shifts(owner, other)
+            blocked[starts[(starts >= 0) & (starts <= max_offset)]] = True
+        return blocked
+
+
+@metrics.timed("kka_stage_seconds", stage="csp_schedule")
+def csp_schedule(
+    paths,
+    obstacles: ObstacleIndex,
+    max_offset=20,
+    progress_cb: Optional[ProgressCallback] = None,
+    deadline: Optional[Deadline] = None,
+):
+    """Backtracking search for start offsets that keep robots off each other and the forklifts.
+
+    When ``deadline`` expires the deepest partial placement found so far is returned with ``ok``
+    false and ``cut_off`` set; robots it does not cover start without delay.
+    """
     max_path_len = 0
     for seq in paths.values():
         if isinstance(seq, list):
             max_path_len = max(max_path_len, len(seq))
     horizon = int(max_offset + max_path_len + 10)
-    obstruct = set()
-    obstruct_edges = set()
-    for ob in moving_obstacles:
-        p = ob.get("path", [])
-        L = len(p)
-        if L == 0:
-            continue
-        looping = bool(ob.get("loop", True))
-        for t in range(horizon + 1):
-            a = p[obstacle_timeline_index(L, t, looping)]
-            obstruct.add((a, t))
-            if L > 1:
-                next_idx = obstacle_timeline_index(L, t + 1, looping)
-                b = p[next_idx]
-                if a != b:
-                    obstruct_edges.add((a, b, t))
+    reservations = ReservationTable(obstacles)
     robots = list(paths.keys())
+    for r in robots:
+        reservations.register(r, paths[r])
     assigned = {}
+    best_partial = {}
+    cut_off = False
     nodes_expanded = 0
+    backtracks = 0
     last_emit_nodes = 0
     emit_interval = max(25, len(robots) * 10)
 
@@ -60,85 +206,45 @@ def csp_schedule(paths, moving_obstacles, max_offset=20, progress_cb: Optional[P
     emit("start")
 
     def backtrack(idx):
-        nonlocal nodes_expanded, last_emit_nodes
+        nonlocal nodes_expanded, backtracks, last_emit_nodes, best_partial, cut_off
         if idx == len(robots):
             return True
+        if len(assigned) > len(best_partial):
+            best_partial = dict(assigned)
         r = robots[idx]
-        P = paths[r]
+        blocked = reservations.blocked_offsets(r, max_offset)
         for s in range(0, max_offset + 1):
+            if deadline is not None and deadline.expired():
+                cut_off = True
+                return False
             nodes_expanded += 1
             if nodes_expanded - last_emit_nodes >= emit_interval:
                 last_emit_nodes = nodes_expanded
                 emit("search_tick", {"robot": r, "offset": s})
-            bad = False
-            for k, cell in enumerate(P):
-                t = s + k
-                if (cell, t) in obstruct:
-                    bad = True
-                    break
-            if bad:
-                continue
-            for k in range(len(P) - 1):
-                a = P[k]
-                b = P[k + 1]
-                t = s + k
-                if (b, a, t) in obstruct_edges:
-                    bad = True
-                    break
-            if bad:
-                continue
-            for other, so in assigned.items():
-                Po = paths[other]
-                for k, cell in enumerate(P):
-                    t = s + k
-                    for mo, k2 in enumerate(Po):
-                        if so + mo == t and k2 == cell:
-                            bad = True
-                            break
-                    if bad:
-                        break
-                if bad:
-                    break
-                for k in range(len(P) - 1):
-                    a = P[k]
-                    b = P[k + 1]
-                    t = s + k
-                    for mo in range(len(Po) - 1):
-                        a2 = Po[mo]
-                        b2 = Po[mo + 1]
-                        if so + mo == t and a == b2 and b == a2:
-                            bad = True
-                            break
-                    if bad:
-                        break
-                if bad:
-                    break
-            if bad:
+            if blocked[s]:
                 continue
             assigned[r] = s
+            reservations.reserve(r, s)
             emit("robot_assigned", {"robot": r, "offset": s})
             if backtrack(idx + 1):
                 return True
+            if cut_off:
+                return False
+            backtracks += 1
             emit("robot_backtrack", {"robot": r, "offset": s})
+            reservations.release(r)
             del assigned[r]
         return False
 
     ok = backtrack(0)
-    emit("done", {"ok": ok})
-    return {"ok": ok, "start_times": assigned, "nodes": nodes_expanded}
-
-
-def build_dynamic_obstacle_timeline(moving: List[dict], horizon: int, start_time: int = 0) -> Dict[int, Set[Tuple[int, int]]]:
-    timeline: Dict[int, Set[Tuple[int, int]]] = {}
-    for t in range(horizon + 1):
-        timeline[start_time + t] = set()
-    for ob in moving:
-        path = ob.get("path", [])
-        if not path:
-            continue
-        period = len(path)
-        looping = bool(ob.get("loop", True))
-        for idx in range(horizon + 1):
-            cell = parse_cell(path[obstacle_timeline_index(period, start_time + idx, looping)])
-            timeline[start_time + idx].add(cell)
-    return timeline
+    emit("done", {"ok": ok, "cut_off": cut_off})
+    metrics.inc("kka_csp_nodes_total", nodes_expanded)
+    metrics.inc("kka_csp_backtracks_total", backtracks)
+    if cut_off:
+        metrics.inc("kka_search_cutoffs_total", stage="csp")
+    return {
+        "ok": ok,
+        "start_times": best_partial if cut_off else assigned,
+        "nodes": nodes_expanded,
+        "cut_off": cut_off,
+    }
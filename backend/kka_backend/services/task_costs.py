@@ -0,0 +1,95 @@
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from kka_backend.services.paths import PathLibrary
+
+Cell = Tuple[int, int]
+
+OBJECTIVES = ("sum", "makespan", "weighted")
+
+
+class Objective:
+    """How per-robot route costs are folded into one score.
+
+    ``sum`` adds them up, ``makespan`` takes the largest (the last robot to finish) and ``weighted``
+    blends the two as ``(1 - weight) * sum + weight * makespan``.
+    """
+
+    def __init__(self, mode: str = "sum", weight: float = 0.5) -> None:
+        self.mode = mode if mode in OBJECTIVES else "sum"
+        self.weight = min(1.0, max(0.0, float(weight)))
+        if self.mode == "weighted" and self.weight in (0.0, 1.0):
+            self.mode = "makespan" if self.weight else "sum"
+
+    def combine(self, loads: np.ndarray) -> np.ndarray:
+        """Scores along the last axis of a ``(..., robots)`` array of route costs."""
+        if self.mode == "sum":
+            return loads.sum(axis=-1)
+        if self.mode == "makespan":
+            return loads.max(axis=-1)
+        return (1.0 - self.weight) * loads.sum(axis=-1) + self.weight * loads.max(axis=-1)
+
+    def score(self, loads: Sequence[float]) -> float:
+        if self.mode == "sum":
+            return sum(loads)
+        if self.mode == "makespan":
+            return max(loads)
+        return (1.0 - self.weight) * sum(loads) + self.weight * max(loads)
+
+
+class TaskCosts:
+    """Path costs between robots and tasks, addressed by position in ``robots`` and ``tasks``.
+
+    ``start[r, t]`` is the cost for robot ``r`` to reach task ``t`` and ``legs[a, b]`` the cost of
+    moving on from task ``a`` to task ``b``; unreachable pairs are ``inf``.
+
+    A chromosome is a permutation of ``range(len(tasks) + len(robots) - 1)``: genes below
+    ``len(tasks)`` are tasks and the rest are separators, so robot ``r`` takes the tasks between the
+    ``r``-th and ``r + 1``-th separator and loads may differ between robots.
+    """
+
+    def __init__(self, robots: Sequence[Cell], tasks: Sequence[Cell], start: np.ndarray, legs: np.ndarray) -> None:
+        self.robots = list(robots)
+        self.tasks = list(tasks)
+        self.start = start
+        self.legs = legs
+
+    @classmethod
+    def build(cls, robots: Sequence[Cell], tasks: Sequence[Cell], planner: PathLibrary) -> "TaskCosts":
+        planner.prepare(list(robots) + list(tasks))
+        return cls(robots, tasks, planner.cost_matrix(robots, tasks), planner.cost_matrix(tasks, tasks))
+
+    @property
+    def genes(self) -> int:
+        return len(self.tasks) + max(0, len(self.robots) - 1)
+
+    def routes(self, assigned: Dict[Cell, List[Cell]]) -> List[List[int]]:
+        """Per-robot task index lists for an assignment keyed by robot cell."""
+        index: Dict[Cell, List[int]] = {}
+        for pos, task in enumerate(self.tasks):
+            index.setdefault(task, []).append(pos)
+        return [[index[task].pop(0) for task in assigned.get(r, []) if index.get(task)] for r in self.robots]
+
+    def from_routes(self, routes: Sequence[Sequence[int]]) -> Dict[Cell, List[Cell]]:
+        return {r: [self.tasks[pos] for pos in route] for r, route in zip(self.robots, routes)}
+
+    def chromosome(self, assigned: Dict[Cell, List[Cell]]) -> List[int]:
+        """Encode an assignment, handing any task it left out to the last robot."""
+        routes = self.routes(assigned)
+        taken = {pos for route in routes for pos in route}
+        routes[-1].extend(pos for pos in range(len(self.tasks)) if pos not in taken)
+        chrom = list(routes[0])
+        for sep, route in enumerate(routes[1:]):
+            chrom.append(len(self.tasks) + sep)
+            chrom.extend(route)
+        return chrom
+
+    def decode(self, chrom: Sequence[int]) -> Dict[Cell, List[Cell]]:
+        routes: List[List[int]] = [[]]
+        for gene in chrom:
+            if gene >= len(self.tasks):
+                routes.append([])
+            else:
+                routes[-1].append(gene)
+        return self.from_routes(routes)
@@ -0,0 +1,50 @@
+import time
+from typing import Any, Dict, Optional
+
+
+class Deadline:
+    """Wall-clock budget for anytime searches; a missing or non-positive budget never expires.
+
+    ``expired`` latches ``cut_off`` the first time it returns ``True`` so callers can report whether
+    a search converged or was stopped early.
+    """
+
+    def __init__(self, budget_ms: Optional[float] = None) -> None:
+        self.budget_ms = float(budget_ms) if budget_ms is not None and float(budget_ms) > 0 else None
+        self.expires_at = None if self.budget_ms is None else time.monotonic() + self.budget_ms / 1000.0
+        self.cut_off = False
+
+    @classmethod
+    def from_body(cls, body: dict) -> "Deadline":
+        try:
+            return cls(body.get("time_budget_ms"))
+        except (TypeError, ValueError):
+            return cls()
+
+    @classmethod
+    def resume(cls, remaining_ms: Optional[float]) -> "Deadline":
+        """Rebuild a deadline from another's ``remaining_ms``: ``None`` never expires, ``0`` already has."""
+        deadline = cls()
+        if remaining_ms is not None:
+            deadline.budget_ms = max(0.0, float(remaining_ms))
+            deadline.expires_at = time.monotonic() + deadline.budget_ms / 1000.0
+        return deadline
+
+    def expired(self) -> bool:
+        if self.expires_at is None:
+            return False
+        if not self.cut_off and time.monotonic() >= self.expires_at:
+            self.cut_off = True
+        return self.cut_off
+
+    def remaining_ms(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return max(0.0, (self.expires_at - time.monotonic()) * 1000.0)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "time_budget_ms": self.budget_ms,
+            "converged": not self.cut_off,
+            "cut_off": self.cut_off,
+        }
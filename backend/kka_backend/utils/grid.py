@@ -1,35 +1,244 @@
+import base64
+import binascii
+import hashlib
+import heapq
+import itertools
 from collections import deque
-from typing import Iterable, List, Optional, Sequence, Set, Tuple
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
 
-from .geometry import neighbors4
+import numpy as np
 
 
-def get_free_cells(grid: List[List[int]]) -> List[Tuple[int, int]]:
-    height = len(grid)
-    width = len(grid[0]) if height else 0
-    return [(r, c) for r in range(height) for c in range(width) if grid[r][c] == 0]
+class Grid:
+    """Row-major occupancy grid stored as one byte per cell, addressed by ``r * width + c``."""
 
+    __slots__ = ("height", "width", "cells", "offsets")
 
-def bfs_component(grid: List[List[int]], start: Tuple[int, int]) -> Set[Tuple[int, int]]:
-    height = len(grid)
-    width = len(grid[0]) if height else 0
-    visited: Set[Tuple[int, int]] = set()
-    queue = deque([start])
-    visited.add(start)
-    while queue:
-        cell = queue.popleft()
-        for nb in neighbors4(cell, height, width):
-            if grid[nb[0]][nb[1]] != 0:
-                continue
-            if nb in visited:
+    def __init__(self, height: int, width: int, cells: Optional[bytearray] = None) -> None:
+        self.height = height
+        self.width = width
+        self.cells = cells if cells is not None else bytearray(height * width)
+        self.offsets = (width, -width, 1, -1)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[int]]) -> "Grid":
+        if isinstance(rows, Grid):
+            return rows
+        try:
+            height = len(rows)
+            width = len(rows[0]) if height else 0
+            if not height or not width:
+                return cls(height, width)
+            if any(len(row) != width for row in rows):
+                raise GridFormatError("grid rows must all have the same width")
+            arr = np.asarray(rows, dtype=np.int64).reshape(height, width)
+        except GridFormatError:
+            raise
+        except (ValueError, TypeError) as exc:
+            raise GridFormatError(f"grid must be a list of rows of integer cells: {exc}") from exc
+        if ((arr != 0) & (arr != 1)).any():
+            raise GridFormatError("grid cells must be 0 (free) or 1 (wall)")
+        return cls(height, width, bytearray(arr.astype(np.uint8).tobytes()))
+
+    @property
+    def size(self) -> int:
+        return self.height * self.width
+
+    @property
+    def array(self) -> np.ndarray:
+        return np.frombuffer(self.cells, dtype=np.uint8).reshape(self.height, self.width)
+
+    def fingerprint(self) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self.height.to_bytes(4, "little"))
+        digest.update(self.width.to_bytes(4, "little"))
+        digest.update(self.cells)
+        return digest.hexdigest()
+
+    def copy(self) -> "Grid":
+        return Grid(self.height, self.width, bytearray(self.cells))
+
+    def in_bounds(self, cell: Tuple[int, int]) -> bool:
+        return 0 <= cell[0] < self.height and 0 <= cell[1] < self.width
+
+    def cell_id(self, cell: Tuple[int, int]) -> int:
+        return cell[0] * self.width + cell[1]
+
+    def coords(self, idx: int) -> Tuple[int, int]:
+        return divmod(idx, self.width)
+
+    def is_free(self, cell: Tuple[int, int]) -> bool:
+        return self.in_bounds(cell) and self.cells[cell[0] * self.width + cell[1]] == 0
+
+    def is_wall(self, cell: Tuple[int, int]) -> bool:
+        return self.in_bounds(cell) and self.cells[cell[0] * self.width + cell[1]] == 1
+
+    def set(self, cell: Tuple[int, int], value: int) -> None:
+        self.cells[cell[0] * self.width + cell[1]] = value
+
+    def neighbors(self, idx: int) -> List[int]:
+        down, up, right, left = self.offsets
+        col = idx % self.width
+        out = []
+        if idx + down < len(self.cells):
+            out.append(idx + down)
+        if idx + up >= 0:
+            out.append(idx + up)
+        if col + 1 < self.width:
+            out.append(idx + right)
+        if col:
+            out.append(idx + left)
+        return out
+
+    def free_mask(self) -> np.ndarray:
+        return self.array == 0
+
+
+def get_free_cells(grid: Grid) -> List[Tuple[int, int]]:
+    width = grid.width
+    return [divmod(int(idx), width) for idx in np.flatnonzero(grid.array.reshape(-1) == 0)]
+
+
+@lru_cache(maxsize=8)
+def neighbor_table(height: int, width: int) -> np.ndarray:
+    ids = np.arange(height * width, dtype=np.int64).reshape(height, width)
+    table = np.full((height, width, 4), -1, dtype=np.int64)
+    table[:-1, :, 0] = ids[1:, :]
+    table[1:, :, 1] = ids[:-1, :]
+    table[:, :-1, 2] = ids[:, 1:]
+    table[:, 1:, 3] = ids[:, :-1]
+    table = table.reshape(-1, 4)
+    table.setflags(write=False)
+    return table
+
+
+def wavefront(free: np.ndarray, sources: Sequence[Tuple[int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+    height, width = free.shape
+    size = height * width
+    dist = np.full((len(sources), size), -1, dtype=np.int32)
+    parent = np.full((len(sources), size), -1, dtype=np.int32)
+    if not size or not len(sources):
+        return dist, parent
+    flat_free = free.reshape(-1)
+    flat_dist = dist.reshape(-1)
+    flat_parent = parent.reshape(-1)
+    table = neighbor_table(height, width)
+    seeds = [(row, r * width + c) for row, (r, c) in enumerate(sources) if 0 <= r < height and 0 <= c < width]
+    if not seeds:
+        return dist, parent
+    owners, cells = (np.asarray(col, dtype=np.int64) for col in zip(*seeds))
+    flat_dist[owners * size + cells] = 0
+    step = 0
+    while cells.size:
+        step += 1
+        nbs = table[cells].reshape(-1)
+        owners = np.repeat(owners, 4)
+        cells = np.repeat(cells, 4)
+        keep = nbs >= 0
+        nbs, owners, cells = nbs[keep], owners[keep], cells[keep]
+        keep = flat_free[nbs]
+        nbs, owners, cells = nbs[keep], owners[keep], cells[keep]
+        keys = owners * size + nbs
+        keep = flat_dist[keys] < 0
+        keys, cells = keys[keep], cells[keep]
+        flat_dist[keys] = step
+        flat_parent[keys] = cells
+        # Duplicate discoveries of a cell keep only the write that won the scatter.
+        keys = keys[flat_parent[keys] == cells]
+        owners, cells = np.divmod(keys, size)
+    return dist, parent
+
+
+def _subtree(parent: np.ndarray, roots: np.ndarray) -> np.ndarray:
+    size = parent.size
+    linked = np.flatnonzero(parent >= 0)
+    order = linked[np.argsort(parent[linked], kind="stable")]
+    counts = np.bincount(parent[linked], minlength=size)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    chunks = [roots]
+    frontier = roots
+    while frontier.size:
+        lens = counts[frontier]
+        total = int(lens.sum())
+        if not total:
+            break
+        base = np.repeat(starts[frontier] - np.concatenate(([0], np.cumsum(lens)[:-1])), lens)
+        frontier = order[base + np.arange(total)]
+        chunks.append(frontier)
+    return np.concatenate(chunks)
+
+
+def repair_field(
+    grid: Grid,
+    dist: np.ndarray,
+    parent: np.ndarray,
+    added: Sequence[int],
+    removed: Sequence[int],
+    limit: int,
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Patch a wavefront field after wall edits; ``None`` means more than ``limit`` cells changed."""
+    roots = np.asarray([idx for idx in added if dist[idx] > 0], dtype=np.int64)
+    affected = _subtree(parent, roots) if roots.size else roots
+    if affected.size > limit:
+        return None
+    dist_l = dist.tolist()
+    parent_l = parent.tolist()
+    for idx in affected.tolist():
+        dist_l[idx] = -1
+        parent_l[idx] = -1
+    cells = grid.cells
+    heap: List[Tuple[int, int]] = []
+
+    def seed(idx: int) -> None:
+        best = -1
+        via = -1
+        for nb in grid.neighbors(idx):
+            d = dist_l[nb]
+            if d >= 0 and (best < 0 or d + 1 < best):
+                best = d + 1
+                via = nb
+        if best >= 0 and (dist_l[idx] < 0 or best < dist_l[idx]):
+            dist_l[idx] = best
+            parent_l[idx] = via
+            heapq.heappush(heap, (best, idx))
+
+    for idx in affected.tolist():
+        if cells[idx] == 0:
+            seed(idx)
+    for idx in removed:
+        if cells[idx] == 0 and dist_l[idx] != 0:
+            seed(idx)
+    budget = limit
+    while heap:
+        d, idx = heapq.heappop(heap)
+        if d != dist_l[idx]:
+            continue
+        budget -= 1
+        if budget < 0:
+            return None
+        for nb in grid.neighbors(idx):
+            if cells[nb] != 0:
                 continue
-            visited.add(nb)
-            queue.append(nb)
-    return visited
+            if dist_l[nb] < 0 or d + 1 < dist_l[nb]:
+                dist_l[nb] = d + 1
+                parent_l[nb] = idx
+                heapq.heappush(heap, (d + 1, nb))
+    return np.asarray(dist_l, dtype=dist.dtype), np.asarray(parent_l, dtype=parent.dtype)
+
+
+def diff_walls(old: Grid, new: Grid) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    if (old.height, old.width) != (new.height, new.width):
+        return [], []
+    before = old.array.reshape(-1)
+    after = new.array.reshape(-1)
+    added = np.flatnonzero((after == 1) & (before != 1))
+    removed = np.flatnonzero((after == 0) & (before != 0))
+    return [new.coords(int(idx)) for idx in added], [new.coords(int(idx)) for idx in removed]
 
 
 def shortest_path(
-    grid: List[List[int]],
+    grid: Grid,
     start: Tuple[int, int],
     goal: Tuple[int, int],
     blocked: Set[Tuple[int, int]],
@@ -37,41 +246,123 @@ def shortest_path(
 ) -> Optional[List[Tuple[int, int]]]:
     if start == goal:
         return [start]
-    height = len(grid)
-    width = len(grid[0]) if height else 0
+    cells = grid.cells
     allow = allow or set()
-    queue = deque([(start, [start])])
-    visited = {start}
+    blocked_ids = {grid.cell_id(cell) for cell in blocked if cell not in allow and grid.in_bounds(cell)}
+    origin = grid.cell_id(start)
+    target = grid.cell_id(goal)
+    came = {origin: -1}
+    queue = deque([origin])
     while queue:
-        cell, path = queue.popleft()
-        for nb in neighbors4(cell, height, width):
-            if grid[nb[0]][nb[1]] == 1:
+        idx = queue.popleft()
+        for nb in grid.neighbors(idx):
+            if cells[nb] == 1:
                 continue
-            if nb in blocked and nb not in allow:
+            if nb in blocked_ids:
                 continue
-            if nb in visited:
+            if nb in came:
                 continue
-            visited.add(nb)
-            new_path = path + [nb]
-            if nb == goal:
-                return new_path
-            queue.append((nb, new_path))
+            came[nb] = idx
+            if nb == target:
+                path = []
+                while nb >= 0:
+                    path.append(grid.coords(nb))
+                    nb = came[nb]
+                path.reverse()
+                return path
+            queue.append(nb)
     return None
 
 
-def ensure_perimeter_clear(grid: List[List[int]]) -> None:
-    height = len(grid)
-    width = len(grid[0]) if height else 0
-    for r in range(height):
-        grid[r][0] = 0
-        grid[r][width - 1] = 0
-    for c in range(width):
-        grid[0][c] = 0
-        grid[height - 1][c] = 0
+def ensure_perimeter_clear(grid: Grid) -> None:
+    if not grid.size:
+        return
+    arr = grid.array
+    arr[:, 0] = 0
+    arr[:, -1] = 0
+    arr[0, :] = 0
+    arr[-1, :] = 0
+
+
+GRID_ENCODINGS = ("rows", "bitset", "rle")
+
+
+class GridFormatError(ValueError):
+    pass
+
+
+def encode_grid(grid: Grid, encoding: str = "rows") -> Union[np.ndarray, Dict[str, Any]]:
+    """Wire form of a grid: a ``(height, width)`` array that serialises as nested rows, or a compact
+    ``{"encoding", "height", "width", ...}`` object.
+
+    ``bitset`` packs the row-major cells eight to a byte (most significant bit first) and base64
+    encodes them under ``data``. ``rle`` gives each row under ``rows`` as alternating run lengths of
+    free and wall cells, starting with a (possibly empty) free run.
+    """
+    if encoding == "bitset":
+        data = np.packbits(grid.array.reshape(-1) != 0).tobytes()
+        encoded = base64.b64encode(data).decode("ascii")
+        return {"encoding": "bitset", "height": grid.height, "width": grid.width, "data": encoded}
+    if encoding == "rle":
+        rows = []
+        for row in grid.array != 0:
+            edges = np.flatnonzero(row[1:] != row[:-1]) + 1
+            runs = np.diff(np.concatenate(([0], edges, [grid.width]))).tolist()
+            rows.append([0] + runs if row.size and row[0] else runs)
+        return {"encoding": "rle", "height": grid.height, "width": grid.width, "rows": rows}
+    return grid.array.copy()
+
+
+def decode_grid(payload: Dict[str, Any]) -> Grid:
+    """Unpack an ``encode_grid`` object straight into a new grid's cell buffer."""
+    encoding = payload.get("encoding")
+    try:
+        height = int(payload.get("height", 0))
+        width = int(payload.get("width", 0))
+    except (TypeError, ValueError):
+        raise GridFormatError("grid height and width must be integers") from None
+    if height < 0 or width < 0:
+        raise GridFormatError("grid height and width must not be negative")
+    size = height * width
+    grid = Grid(height, width)
+    cells = np.frombuffer(grid.cells, dtype=np.uint8)
+    if encoding == "bitset":
+        try:
+            packed = np.frombuffer(base64.b64decode(payload.get("data") or "", validate=True), dtype=np.uint8)
+        except (binascii.Error, TypeError, ValueError):
+            raise GridFormatError("bitset grid data is not valid base64") from None
+        if packed.size != (size + 7) // 8:
+            raise GridFormatError(f"bitset grid data has {packed.size} bytes, expected {(size + 7) // 8}")
+        cells[:] = np.unpackbits(packed, count=size)
+        return grid
+    if encoding == "rle":
+        rows = payload.get("rows")
+        if not isinstance(rows, list) or len(rows) != height:
+            raise GridFormatError(f"rle grid needs {height} rows")
+        try:
+            counts = np.asarray([len(row) for row in rows], dtype=np.int64)
+            runs = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64, count=int(counts.sum()))
+        except (TypeError, ValueError):
+            raise GridFormatError("rle grid rows must be lists of run lengths") from None
+        owner = np.repeat(np.arange(height), counts)
+        if (runs < 0).any() or (np.bincount(owner, weights=runs, minlength=height) != width).any():
+            raise GridFormatError(f"every rle grid row must cover {width} cells")
+        # Runs alternate free/wall within a row, so a run's value is the parity of its place in the row.
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        cells[:] = np.repeat((np.arange(runs.size) - first) & 1, runs)
+        return grid
+    raise GridFormatError(f"unknown grid encoding {encoding!r}")
+
+
+def grid_encoding(body: Dict[str, Any]) -> str:
+    """Encoding for grids in a response: ``grid_encoding`` if given, else whatever the request sent."""
+    encoding = body.get("grid_encoding")
+    if encoding is None and isinstance(body.get("grid"), dict):
+        encoding = body["grid"].get("encoding")
+    return encoding if encoding in GRID_ENCODINGS else "rows"
 
 
-def normalize_grid(grid_raw: Sequence[Sequence[int]]) -> List[List[int]]:
-    grid = []
-    for row in grid_raw:
-        grid.append([int(v) for v in row])
-    return grid
+def normalize_grid(grid_raw: Union[Sequence[Sequence[int]], Dict[str, Any]]) -> Grid:
+    if isinstance(grid_raw, dict):
+        return decode_grid(grid_raw)
+    return Grid.from_rows(grid_raw)
@@ -0,0 +1,95 @@
+import json
+from typing import Any, Callable, Optional
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # stdlib json is the fallback
+    orjson = None
+
+ENGINE = "orjson" if orjson is not None else "json"
+
+
+def _converter(default: Optional[Callable[[Any], Any]]) -> Callable[[Any], Any]:
+    def convert(obj: Any) -> Any:
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if default is not None:
+            return default(obj)
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    return convert
+
+
+def dumps_bytes(
+    obj: Any,
+    default: Optional[Callable[[Any], Any]] = None,
+    sort_keys: bool = False,
+    indent: bool = False,
+) -> bytes:
+    """Compact UTF-8 JSON; tuples and NumPy arrays and scalars are written as plain JSON values.
+
+    Object keys must already be strings (callers key robots as ``str(list(cell))``), so both engines
+    produce the same document.
+    """
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_converter(default), option=option)
+    return dumps(obj, default=default, sort_keys=sort_keys, indent=indent).encode("utf-8")
+
+
+def dumps(
+    obj: Any,
+    default: Optional[Callable[[Any], Any]] = None,
+    sort_keys: bool = False,
+    indent: bool = False,
+) -> str:
+    if orjson is not None:
+        return dumps_bytes(obj, default=default, sort_keys=sort_keys, indent=indent).decode("utf-8")
+    separators = (",", ": ") if indent else (",", ":")
+    return json.dumps(
+        obj,
+        default=_converter(default),
+        sort_keys=sort_keys,
+        indent=2 if indent else None,
+        separators=separators,
+        ensure_ascii=False,
+    )
+
+
+def loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by ``dumps_bytes``/``loads``: orjson when installed, stdlib otherwise.
+
+    Types Flask's own provider knows (dates, UUIDs, dataclasses, ...) still go through its ``default``.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(
+            obj,
+            default=self.default,
+            sort_keys=kwargs.get("sort_keys", self.sort_keys),
+            indent=bool(kwargs.get("indent")),
+        )
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        body = dumps_bytes(obj, default=self.default, sort_keys=self.sort_keys, indent=indent)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
@@ -0,0 +1,36 @@
+from typing import Any, Iterable, Iterator, Tuple
+
+from kka_backend.utils.json_codec import dumps
+
+
+class StreamObject:
+    """A JSON object whose ``(key, value)`` pairs come from an iterable and are encoded one at a time."""
+
+    __slots__ = ("pairs",)
+
+    def __init__(self, pairs: Iterable[Tuple[str, Any]]) -> None:
+        self.pairs = pairs
+
+
+def iter_json(value: Any) -> Iterator[str]:
+    """Encode ``value`` as JSON text in chunks.
+
+    Dicts are walked so that any ``StreamObject`` inside them is emitted one member per chunk; every
+    other value is encoded whole. Joining the chunks gives the same document as ``json.dumps`` of the
+    value with each ``StreamObject`` replaced by a dict of its pairs.
+    """
+    if isinstance(value, (StreamObject, dict)):
+        yield "{"
+        sep = ""
+        for key, item in value.pairs if isinstance(value, StreamObject) else value.items():
+            head = sep + dumps(str(key)) + ":"
+            if isinstance(item, (StreamObject, dict)):
+                yield head
+                yield from iter_json(item)
+            else:
+                yield head + dumps(item)
+            sep = ","
+        yield "}"
+    else:
+        yield dumps(value)
+
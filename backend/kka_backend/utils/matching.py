@@ -0,0 +1,64 @@
+from typing import List, Tuple
+
+import numpy as np
+
+
+def min_cost_matching(cost: np.ndarray) -> List[Tuple[int, int]]:
+    """Minimum-cost one-to-one ``(row, col)`` pairs for a rectangular cost matrix.
+
+    Hungarian method with potentials (shortest augmenting paths), O(n^2 m) for n <= m with the inner
+    loop over columns vectorized. Every row is matched when there are no more rows than columns,
+    otherwise every column. ``inf`` marks a forbidden pair: the matching uses as few of them as
+    possible and drops the ones it could not avoid.
+    """
+    cost = np.asarray(cost, dtype=float)
+    if cost.size == 0:
+        return []
+    transposed = cost.shape[0] > cost.shape[1]
+    work = cost.T if transposed else cost
+    finite = np.isfinite(work)
+    if not finite.any():
+        return []
+    lo = work[finite].min()
+    forbidden = (work[finite].max() - lo + 1.0) * (work.shape[0] + 1)
+    work = np.where(finite, work - lo, forbidden)
+
+    n, m = work.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    match = np.zeros(m + 1, dtype=np.int64)
+    way = np.zeros(m + 1, dtype=np.int64)
+    for row in range(1, n + 1):
+        match[0] = row
+        col = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[col] = True
+            current = match[col]
+            free = ~used[1:]
+            reduced = work[current - 1] - u[current] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = col
+            candidates = np.where(free, minv[1:], np.inf)
+            nxt = int(candidates.argmin()) + 1
+            delta = candidates[nxt - 1]
+            u[match[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            col = nxt
+            if match[col] == 0:
+                break
+        while col:
+            prev = way[col]
+            match[col] = match[prev]
+            col = prev
+
+    pairs = []
+    for col in range(1, m + 1):
+        row = int(match[col])
+        if row and finite[row - 1, col - 1]:
+            pairs.append((col - 1, row - 1) if transposed else (row - 1, col - 1))
+    pairs.sort()
+    return pairs
@@ -10,7 +10,7 @@ import { RobotDetailModal } from "./components/RobotDetailModal";
 import { RobotLegend } from "./components/RobotLegend";
 import { RobotSummaryList } from "./components/RobotSummaryList";
 import { ActionProgressPanel } from "./components/ActionProgressPanel";
-import { MAX_HEIGHT, MAX_ROBOTS, MAX_WIDTH, COLORS } from "./constants/config";
+import { MAX_HEIGHT, MAX_ROBOTS, MAX_WIDTH, COLORS, PROGRESS_STREAM } from "./constants/config";
 import { useManualEdits } from "./hooks/useManualEdits";
 import { useProgressBars } from "./hooks/useProgressBars";
 import { backendApi } from "./services/backendApi";
@@ -40,6 +40,7 @@ export default function App() {
   const [stats, setStats] = useState({});
   const [selectedAlg, setSelectedAlg] = useState("astar");
   const [optimizer, setOptimizer] = useState("greedy");
+  const [objective, setObjective] = useState("sum");
   const [speed, setSpeed] = useState(6);
   const [simPlaying, setSimPlaying] = useState(false);
   const [simPaused, setSimPaused] = useState(false);
@@ -54,7 +55,6 @@ export default function App() {
   const completedTasksRef = useRef(new Set());
   const [globalSimTime, setGlobalSimTime] = useState(0);
   const [selectedRobotKey, setSelectedRobotKey] = useState(null);
-  const [stepMetadata, setStepMetadata] = useState({});
   const [metricDetail, setMetricDetail] = useState(null);
   const [lastPlanResult, setLastPlanResult] = useState(null);
   const [planDirty, setPlanDirty] = useState(true);
@@ -107,7 +107,9 @@ export default function App() {
 
   const clearProgressTimer = useCallback((key) => {
     const timer = progressTimersRef.current[key];
-    if (timer && typeof window !== "undefined") {
+    if (timer && typeof timer.close === "function") {
+      timer.close();
+    } else if (timer && typeof window !== "undefined") {
       window.clearInterval(timer);
     }
     delete progressTimersRef.current[key];
@@ -150,7 +152,7 @@ export default function App() {
           const res = await backendApi.getProgress(jobId);
           if (res?.ok && res.progress) {
             handleRemoteProgress(key, res.progress);
-            if (res.progress.status !== "running") {
+            if (res.progress.status !== "running" && res.progress.status !== "queued") {
               clearProgressTimer(key);
             }
           }
@@ -158,9 +160,46 @@ export default function App() {
           console.warn("progress poll failed", error);
         }
       };
-      tick();
+      const startPolling = () => {
+        tick();
+        clearProgressTimer(key);
+        progressTimersRef.current[key] = window.setInterval(tick, 900);
+      };
+      // Streaming holds a server worker for the whole job, so it is opt-in (REACT_APP_PROGRESS_STREAM=1).
+      if (!PROGRESS_STREAM || typeof window.EventSource !== "function") {
+        startPolling();
+        return;
+      }
+      // The stream sends the full entry first and then only the fields that changed.
+      const state = {};
+      const source = new window.EventSource(backendApi.progressStreamUrl(jobId));
+      source.addEventListener("progress", (event) => {
+        if (progressJobsRef.current[key] !== jobId) {
+          clearProgressTimer(key);
+          return;
+        }
+        try {
+          Object.assign(state, JSON.parse(event.data));
+        } catch (error) {
+          return;
+        }
+        handleRemoteProgress(key, { ...state });
+        if (state.status && state.status !== "running" && state.status !== "queued") {
+          clearProgressTimer(key);
+        }
+      });
+      // The server closes long streams with a "timeout" event; carry on by polling.
+      const fallBack = () => {
+        if (progressTimersRef.current[key] !== source) return;
+        source.close();
+        if (progressJobsRef.current[key] === jobId) {
+          startPolling();
+        }
+      };
+      source.addEventListener("timeout", fallBack);
+      source.onerror = fallBack;
       clearProgressTimer(key);
-      progressTimersRef.current[key] = window.setInterval(tick, 900);
+      progressTimersRef.current[key] = source;
     },
     [handleRemoteProgress, clearProgressTimer]
   );
@@ -366,7 +405,7 @@ export default function App() {
 
   useEffect(() => {
     invalidatePlan();
-  }, [optimizer, selectedAlg, invalidatePlan]);
+  }, [optimizer, objective, selectedAlg, invalidatePlan]);
 
   const generateMap = useCallback(async () => {
     const progressId = await beginProgressJob("generate", "generate_map", "Generating map…");
@@ -406,7 +445,6 @@ export default function App() {
       setRobotSimTimes(new Array(nextRobots.length).fill(0));
       setRobotPositions(nextRobots.map((r) => [r[0], r[1]]));
       setRobotLogs({});
-      setStepMetadata({});
       setStats({});
       resetManualEdits();
       completedTasksRef.current = new Set();
@@ -463,7 +501,6 @@ export default function App() {
     ({ clearAssignments = false, clearStats = true } = {}) => {
       stopAnimation();
       setPaths({});
-      setStepMetadata({});
       setRobotLogs({});
       setSelectedRobotKey(null);
       setMetricDetail(null);
@@ -518,6 +555,7 @@ export default function App() {
           robots,
           tasks,
           optimizer,
+          objective,
           path_alg: selectedAlg === "astar" ? "astar" : "dijkstra",
         };
         const data = await backendApi.planTasks({ ...payload, progress_id: planProgressId });
@@ -571,6 +609,7 @@ export default function App() {
       beginProgressJob,
       finalizeProgressJob,
       grid,
+      objective,
       optimizer,
       resetSimulationUi,
       robots,
@@ -648,7 +687,6 @@ export default function App() {
         },
         csp: data.csp || {},
       }));
-      setStepMetadata(data.step_metadata || {});
       setRobotLogs({});
       await finalizeProgressJob("compute", computeProgressId, "Paths scheduled");
     } catch (err) {
@@ -1015,7 +1053,6 @@ export default function App() {
       setRobotSimTimes(new Array(nextRobots.length).fill(0));
       setRobotPositions(nextRobots.map((r) => [r[0], r[1]]));
       setRobotLogs({});
-      setStepMetadata({});
       completedTasksRef.current = new Set();
       setCompletedTasks(new Set());
       setStatus("edits applied");
@@ -1055,6 +1092,8 @@ export default function App() {
           onComputePaths={computePathsAndSchedule}
           optimizer={optimizer}
           onOptimizerChange={setOptimizer}
+          objective={objective}
+          onObjectiveChange={setObjective}
           selectedAlg={selectedAlg}
           onAlgChange={setSelectedAlg}
           speed={speed}
@@ -7,6 +7,8 @@ export function ControlBar({
   onComputePaths,
   optimizer,
   onOptimizerChange,
+  objective,
+  onObjectiveChange,
   selectedAlg,
   onAlgChange,
   speed,
@@ -40,10 +42,21 @@ export function ControlBar({
         <label className="label">Optimizer</label>
         <select value={optimizer} onChange={(e) => onOptimizerChange(e.target.value)}>
           <option value="greedy">Greedy</option>
+          <option value="greedy_pq">Greedy (path cost)</option>
+          <option value="hungarian">Hungarian rounds</option>
           <option value="ga">Genetic Algorithm</option>
+          <option value="ga_islands">Genetic Algorithm (islands)</option>
           <option value="local">Local Search</option>
         </select>
       </div>
+      <div className="control-group">
+        <label className="label">Objective</label>
+        <select value={objective} onChange={(e) => onObjectiveChange(e.target.value)}>
+          <option value="sum">Total cost</option>
+          <option value="makespan">Makespan</option>
+          <option value="weighted">Balanced</option>
+        </select>
+      </div>
       <div className="control-group">
         <label className="label">Path</label>
         <select value={selectedAlg} onChange={(e) => onAlgChange(e.target.value)}>
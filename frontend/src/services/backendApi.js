@@ -1,5 +1,6 @@
 import axios from "axios";
 import { API_BASE, API_TIMEOUT } from "../constants/config";
+import { decodeGrid, encodeGrid } from "../utils/gridCodec";
 
 const client = axios.create({
   baseURL: API_BASE,
@@ -11,17 +12,31 @@ async function post(path, payload) {
   return response.data;
 }
 
+// Grid endpoints exchange the grid as a base64 bitset instead of nested rows.
+async function postGrid(path, payload) {
+  const body = { ...payload, grid_encoding: "bitset" };
+  if (Array.isArray(body.grid)) {
+    body.grid = encodeGrid(body.grid);
+  }
+  const data = await post(path, body);
+  if (data && data.grid) {
+    data.grid = decodeGrid(data.grid);
+  }
+  return data;
+}
+
 async function get(path) {
   const response = await client.get(path);
   return response.data;
 }
 
 export const backendApi = {
-  generateMap: (payload) => post("/generate_map", payload),
-  planTasks: (payload) => post("/plan_tasks", payload),
-  computePaths: (payload) => post("/compute_paths", payload),
-  replan: (payload) => post("/replan", payload),
-  applyManualEdits: (payload) => post("/manual/apply", payload),
+  generateMap: (payload) => postGrid("/generate_map", payload),
+  planTasks: (payload) => postGrid("/plan_tasks", payload),
+  computePaths: (payload) => postGrid("/compute_paths", { ...payload, stream: true }),
+  replan: (payload) => postGrid("/replan", payload),
+  applyManualEdits: (payload) => postGrid("/manual/apply", payload),
   startProgress: (payload) => post("/progress/start", payload),
   getProgress: (jobId) => get(`/progress/${jobId}`),
+  progressStreamUrl: (jobId) => `${API_BASE}/progress/${jobId}/stream`,
 };
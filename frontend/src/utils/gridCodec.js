@@ -0,0 +1,39 @@
+// Compact "bitset" grid wire format: row-major cells, eight per byte (most significant bit first), base64.
+
+function encodeGrid(grid) {
+  const height = grid.length;
+  const width = height ? grid[0].length : 0;
+  const bytes = new Uint8Array(Math.ceil((height * width) / 8));
+  let idx = 0;
+  for (let r = 0; r < height; r += 1) {
+    const row = grid[r];
+    for (let c = 0; c < width; c += 1) {
+      if (row[c]) bytes[idx >> 3] |= 0x80 >> (idx & 7);
+      idx += 1;
+    }
+  }
+  let binary = "";
+  for (let i = 0; i < bytes.length; i += 0x8000) {
+    binary += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+  }
+  return { encoding: "bitset", height, width, data: btoa(binary) };
+}
+
+function decodeGrid(payload) {
+  if (!payload || Array.isArray(payload) || payload.encoding !== "bitset") return payload;
+  const { height, width } = payload;
+  const binary = atob(payload.data || "");
+  const grid = [];
+  let idx = 0;
+  for (let r = 0; r < height; r += 1) {
+    const row = new Array(width);
+    for (let c = 0; c < width; c += 1) {
+      row[c] = (binary.charCodeAt(idx >> 3) >> (7 - (idx & 7))) & 1;
+      idx += 1;
+    }
+    grid.push(row);
+  }
+  return grid;
+}
+
+export { encodeGrid, decodeGrid };